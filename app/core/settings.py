@@ -18,3 +18,9 @@ DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{(DATA_DIR / 'news.db').as_
 
 # CORS origin
 FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "*")
+
+# Web search cache persistence: set WEB_SEARCH_CACHE_PERSIST=1 to keep cached
+# Tavily results across restarts (stored as JSON in DATA_DIR)
+WEB_SEARCH_CACHE_PATH = (
+    DATA_DIR / "web_search_cache.json" if os.getenv("WEB_SEARCH_CACHE_PERSIST") == "1" else None
+)
@@ -0,0 +1,90 @@
+from datetime import datetime
+from typing import Iterable, List, Tuple
+
+import numpy as np
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.databases.models import ArticleNeighbor, NewsArticle
+
+# Precomputed similar-article lists (the article_neighbors table)
+# - When an article is embedded, the mean of its chunk embeddings is searched
+#   against the chunk index once and the closest other articles are stored
+# - The new article is also offered to each neighbor's own list, so older
+#   articles pick up newer similar stories without being recomputed
+# - The article detail page reads the list with one join, no vector search
+# - articles.neighbors_computed_at marks articles whose own search has run, so
+#   articles without neighbors or with only offered rows are told apart
+
+NEIGHBOR_COUNT = 5
+
+def article_vector(chunk_embeddings) -> np.ndarray:
+    """Mean of the article's normalized chunk embeddings"""
+    matrix = np.asarray(chunk_embeddings, dtype=np.float32)
+    # Not in place: the caller reuses its embeddings
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    return matrix.mean(axis=0)
+
+def nearest_articles(results, article_id: int, n: int = NEIGHBOR_COUNT) -> List[Tuple[int, float]]:
+    """(article id, distance) of the n closest other articles, from chunk search
+    results sorted by distance; each article counts once at its closest chunk"""
+    best = {}
+    for doc, distance in results:
+        other = int(doc.metadata["article_id"])
+        if other != article_id and other not in best:
+            best[other] = float(distance)
+    return list(best.items())[:n]
+
+def _offer_neighbor(db: Session, article_id: int, candidate_id: int, distance: float, n: int):
+    """Add candidate to an article's list if it is closer than the current worst"""
+    rows = db.query(ArticleNeighbor).filter(
+        ArticleNeighbor.article_id == article_id
+    ).order_by(ArticleNeighbor.distance).all()
+
+    for row in rows:
+        if row.neighbor_id == candidate_id:
+            row.distance = min(row.distance, distance)
+            return
+    if len(rows) >= n:
+        if distance >= rows[-1].distance:
+            return
+        db.delete(rows[-1])
+    db.add(ArticleNeighbor(article_id=article_id, neighbor_id=candidate_id, distance=distance))
+
+def store_article_neighbors(
+    db: Session,
+    article_id: int,
+    neighbors: List[Tuple[int, float]],
+    n: int = NEIGHBOR_COUNT
+):
+    """Replace an article's neighbor list, mark it computed (also when empty) and
+    offer the article to its neighbors; the caller commits"""
+    db.query(ArticleNeighbor).filter(
+        ArticleNeighbor.article_id == article_id
+    ).delete(synchronize_session=False)
+    db.query(NewsArticle).filter(NewsArticle.id == article_id).update(
+        {NewsArticle.neighbors_computed_at: datetime.utcnow()}, synchronize_session=False
+    )
+    for neighbor_id, distance in neighbors:
+        db.add(ArticleNeighbor(article_id=article_id, neighbor_id=neighbor_id, distance=distance))
+    db.flush()
+    for neighbor_id, distance in neighbors:
+        _offer_neighbor(db, neighbor_id, article_id, distance, n)
+
+def delete_article_neighbors(db: Session, article_ids: Iterable[int]):
+    """Remove deleted articles from every list (also done by ON DELETE CASCADE where enforced)"""
+    article_ids = list(article_ids)
+    if not article_ids:
+        return
+    db.query(ArticleNeighbor).filter(
+        or_(ArticleNeighbor.article_id.in_(article_ids), ArticleNeighbor.neighbor_id.in_(article_ids))
+    ).delete(synchronize_session=False)
+
+def get_neighbor_articles(db: Session, article_id: int, limit: int = NEIGHBOR_COUNT, columns=(NewsArticle,)) -> list:
+    """Rows of columns plus distance for an article's stored neighbors, closest
+    first, in one query; pass article columns to skip loading the body"""
+    return db.query(*columns, ArticleNeighbor.distance).join(
+        ArticleNeighbor, ArticleNeighbor.neighbor_id == NewsArticle.id
+    ).filter(
+        ArticleNeighbor.article_id == article_id
+    ).order_by(ArticleNeighbor.distance).limit(limit).all()
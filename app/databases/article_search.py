@@ -0,0 +1,171 @@
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import Float, Integer, text
+
+# Full-text index over articles (title, ai_summary, body)
+# - SQLite: an external-content FTS5 table, articles_fts, kept in sync with
+#   articles by insert / update / delete triggers
+# - PostgreSQL: a stored generated tsvector column, articles.search_vector,
+#   weighted title A > summary B > body C, with a GIN index. Adding the column
+#   rewrites articles, so it is a one-off migration
+#   (app/scripts/migrations/add_article_search_index.py), not a startup step
+# - Queries match every word as a prefix ("infla" finds "inflation") and are
+#   ranked (bm25 on SQLite, ts_rank_cd on PostgreSQL); other dialects, or a
+#   database without the index, fall back to ILIKE in the callers
+
+FTS_TABLE = "articles_fts"
+SEARCH_VECTOR = "search_vector"
+SEARCH_INDEX = "idx_articles_search"
+# bm25 column weights (title, ai_summary, body), matching the tsvector weights
+BM25_WEIGHTS = (10.0, 4.0, 1.0)
+
+# Engines known to have the index, so queries skip the catalog lookup; a missing
+# index is looked up again so the migration takes effect without a restart
+_indexed_engines = set()
+
+def search_terms(query: str):
+    """Lowercased words of a search query; punctuation and operators are dropped"""
+    return re.findall(r"\w+", query.lower())
+
+def ensure_search_index(conn) -> bool:
+    """Create the SQLite full-text index if missing, or check that the PostgreSQL
+    migration has run; False when no index is available"""
+    dialect = conn.dialect.name
+    try:
+        if dialect == "sqlite":
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+            ), {"name": FTS_TABLE}).scalar()
+            conn.execute(text(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                    title, ai_summary, body,
+                    content='articles', content_rowid='id', prefix='2 3'
+                )
+            """))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON articles BEGIN
+                    INSERT INTO {FTS_TABLE}(rowid, title, ai_summary, body)
+                    VALUES (new.id, new.title, new.ai_summary, new.body);
+                END
+            """))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON articles BEGIN
+                    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, ai_summary, body)
+                    VALUES ('delete', old.id, old.title, old.ai_summary, old.body);
+                END
+            """))
+            # Only text changes reindex; flag updates (is_processed, is_embedded) do not
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, ai_summary, body ON articles BEGIN
+                    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, ai_summary, body)
+                    VALUES ('delete', old.id, old.title, old.ai_summary, old.body);
+                    INSERT INTO {FTS_TABLE}(rowid, title, ai_summary, body)
+                    VALUES (new.id, new.title, new.ai_summary, new.body);
+                END
+            """))
+            if not exists:
+                # Index the articles stored before the table existed
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+                logging.info(f"Built {FTS_TABLE} full-text index")
+            return True
+
+        if dialect == "postgresql":
+            if has_search_vector(conn):
+                return True
+            logging.warning(
+                "articles has no full-text search column, search falls back to ILIKE; run "
+                "python -m app.scripts.migrations.add_article_search_index"
+            )
+            return False
+    except Exception as e:
+        # e.g. SQLite built without FTS5
+        logging.warning(f"Full-text index unavailable, search falls back to ILIKE: {e}")
+    return False
+
+def has_search_vector(conn) -> bool:
+    """Whether articles has the PostgreSQL search_vector column"""
+    return conn.execute(text(
+        "SELECT 1 FROM information_schema.columns WHERE table_name = 'articles' AND column_name = :name"
+    ), {"name": SEARCH_VECTOR}).scalar() is not None
+
+def add_search_vector(conn) -> bool:
+    """Add the generated search_vector column; False if it already exists.
+    Rewrites the articles table under an exclusive lock."""
+    if has_search_vector(conn):
+        return False
+    # Generated columns are recomputed by PostgreSQL on every insert and update
+    conn.execute(text(f"""
+        ALTER TABLE articles ADD COLUMN {SEARCH_VECTOR} tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(ai_summary, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(body, '')), 'C')
+        ) STORED
+    """))
+    return True
+
+def create_search_gin_index(conn):
+    """Build the GIN index without blocking writes; needs an AUTOCOMMIT connection.
+    An invalid index left by an interrupted build is dropped and rebuilt."""
+    valid = conn.execute(text("""
+        SELECT i.indisvalid FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = :name
+    """), {"name": SEARCH_INDEX}).scalar()
+    if valid is False:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {SEARCH_INDEX}"))
+    conn.execute(text(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {SEARCH_INDEX} ON articles USING GIN ({SEARCH_VECTOR})"
+    ))
+
+def has_search_index(db) -> bool:
+    """Whether the database behind this session has the full-text index"""
+    engine = db.get_bind()
+    key = str(engine.url)
+    if key not in _indexed_engines:
+        dialect = engine.dialect.name
+        if dialect == "sqlite":
+            found = db.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+            ), {"name": FTS_TABLE}).scalar()
+        elif dialect == "postgresql":
+            found = has_search_vector(db)
+        else:
+            found = None
+        if not found:
+            return False
+        _indexed_engines.add(key)
+    return True
+
+def search_matches(db, query: str, include_body: bool = True) -> Optional[object]:
+    """
+    Subquery of (id, rank) for the articles matching every word of query as a
+    prefix; higher rank is a better match. include_body=False restricts the
+    match to title and summary (the feed's search). None when the query has no
+    words or the index is unavailable.
+    """
+    terms = search_terms(query)
+    if not terms or not has_search_index(db):
+        return None
+
+    if db.get_bind().dialect.name == "sqlite":
+        phrase = " ".join(f'"{term}"*' for term in terms)
+        match = phrase if include_body else f"{{title ai_summary}} : ({phrase})"
+        weights = ", ".join(str(weight) for weight in BM25_WEIGHTS)
+        # bm25() is lower for better matches, so it is negated
+        statement = text(f"""
+            SELECT rowid AS id, -bm25({FTS_TABLE}, {weights}) AS rank
+            FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match
+        """).bindparams(match=match)
+    else:
+        # Weight labels restrict the match to title (A) and summary (B)
+        label = "" if include_body else "AB"
+        tsquery = " & ".join(f"{term}:*{label}" for term in terms)
+        statement = text(f"""
+            SELECT id, ts_rank_cd({SEARCH_VECTOR}, to_tsquery('english', :tsquery)) AS rank
+            FROM articles WHERE {SEARCH_VECTOR} @@ to_tsquery('english', :tsquery)
+        """).bindparams(tsquery=tsquery)
+
+    return statement.columns(id=Integer, rank=Float).subquery("search_matches")
@@ -0,0 +1,181 @@
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.databases.models import ArticleChunk, ArticleStat, NewsArticle
+
+# Incrementally maintained statistics (the article_stats table)
+# - Every write path that adds, changes or removes articles or chunks adjusts
+#   the affected counters in the same transaction, so /api/stats is a single
+#   read of a small table instead of count / group-by scans
+# - Articles count towards: their processing states, topic, source and
+#   publication day; chunks towards chunk_day (chunks) and vector_day (articles)
+# - rebuild_article_stats recomputes everything from the source tables; it runs
+#   when the table is first created and during weekly maintenance to correct drift
+
+# Columns an article's counters depend on; query these before changing or deleting rows
+ARTICLE_STAT_COLUMNS = (
+    NewsArticle.source,
+    NewsArticle.topic,
+    NewsArticle.published_at,
+    NewsArticle.is_processed,
+    NewsArticle.is_embedded,
+)
+
+def _day(value) -> str:
+    """YYYY-MM-DD of a datetime, date or the string SQLite's date() returns"""
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+def article_stat_keys(article):
+    """(dimension, key) counters one article contributes to"""
+    keys = [("state", "articles"), ("source", article.source), ("day", _day(article.published_at))]
+    if article.topic:
+        keys.append(("topic", article.topic))
+    if article.is_processed:
+        keys.append(("state", "processed"))
+        if not article.is_embedded:
+            keys.append(("state", "unembedded"))
+    else:
+        keys.append(("state", "unprocessed"))
+    if article.is_embedded:
+        keys.append(("state", "embedded"))
+    return keys
+
+def apply_stat_deltas(db: Session, deltas: Counter):
+    """Add deltas to the counters; the caller commits with its own write"""
+    changed = False
+    for (dimension, key), delta in deltas.items():
+        if not delta:
+            continue
+        changed = True
+        updated = db.query(ArticleStat).filter(
+            ArticleStat.dimension == dimension,
+            ArticleStat.key == key
+        ).update({ArticleStat.count: ArticleStat.count + delta}, synchronize_session=False)
+        if not updated:
+            db.add(ArticleStat(dimension=dimension, key=key, count=delta))
+            db.flush()
+    if changed:
+        # Topics, sources and days that no longer have rows disappear from the stats
+        db.query(ArticleStat).filter(ArticleStat.count <= 0).delete(synchronize_session=False)
+
+def record_articles(db: Session, articles: Iterable, sign: int = 1):
+    """Count articles in (sign=1) or out (sign=-1); rows need ARTICLE_STAT_COLUMNS"""
+    deltas = Counter()
+    for article in articles:
+        for key in article_stat_keys(article):
+            deltas[key] += sign
+    apply_stat_deltas(db, deltas)
+
+def record_article_changes(db: Session, changes: Iterable[tuple]):
+    """Move articles' counters from their old values to their new ones, given (before, after) pairs"""
+    deltas = Counter()
+    for before, after in changes:
+        for key in article_stat_keys(before):
+            deltas[key] -= 1
+        for key in article_stat_keys(after):
+            deltas[key] += 1
+    apply_stat_deltas(db, deltas)
+
+def chunk_day_counts(db: Session, *criteria) -> Dict[str, tuple]:
+    """{day: (chunks, articles)} for the chunks matching criteria, read before deleting them"""
+    day = func.date(ArticleChunk.published_at)
+    rows = db.query(
+        day,
+        func.count(ArticleChunk.id),
+        func.count(func.distinct(ArticleChunk.article_id))
+    ).filter(*criteria).group_by(day).all()
+    return {_day(value): (chunks, articles) for value, chunks, articles in rows}
+
+def record_chunks(db: Session, day_counts: Dict[str, tuple], sign: int = 1):
+    """Count chunks in or out, given {day: (chunks, articles)}"""
+    deltas = Counter()
+    for day, (chunks, articles) in day_counts.items():
+        deltas[("chunk_day", day)] += sign * chunks
+        deltas[("vector_day", day)] += sign * articles
+    apply_stat_deltas(db, deltas)
+
+def drop_chunk_days_before(db: Session, day: date):
+    """Forget chunk counters of days whose partitions were dropped"""
+    db.query(ArticleStat).filter(
+        ArticleStat.dimension.in_(("chunk_day", "vector_day")),
+        ArticleStat.key < _day(day)
+    ).delete(synchronize_session=False)
+
+def rebuild_article_stats(db: Session):
+    """Recompute every counter from the articles and article_chunks tables"""
+    day = func.date(NewsArticle.published_at)
+    groups = db.query(
+        NewsArticle.source,
+        NewsArticle.topic,
+        day.label("published_at"),
+        NewsArticle.is_processed,
+        NewsArticle.is_embedded,
+        func.count(NewsArticle.id).label("total")
+    ).group_by(
+        NewsArticle.source, NewsArticle.topic, day, NewsArticle.is_processed, NewsArticle.is_embedded
+    ).all()
+
+    deltas = Counter()
+    for group in groups:
+        for key in article_stat_keys(group):
+            deltas[key] += group.total
+    for day_key, (chunks, articles) in chunk_day_counts(db).items():
+        deltas[("chunk_day", day_key)] += chunks
+        deltas[("vector_day", day_key)] += articles
+
+    db.query(ArticleStat).delete(synchronize_session=False)
+    db.add_all(
+        ArticleStat(dimension=dimension, key=key, count=count)
+        for (dimension, key), count in deltas.items() if count > 0
+    )
+    db.commit()
+    logging.info(f"Rebuilt article stats ({len(deltas)} counters)")
+
+def ensure_article_stats(db: Session):
+    """Build the counters once for a database that has articles but no stats yet"""
+    if db.query(ArticleStat).first() is None and db.query(NewsArticle.id).first() is not None:
+        rebuild_article_stats(db)
+
+def read_article_stats(db: Session, now: Optional[datetime] = None) -> dict:
+    """Article and vector statistics from one read of article_stats.
+    Recent counts and date ranges have day resolution."""
+    counters = {}
+    for stat in db.query(ArticleStat).all():
+        counters.setdefault(stat.dimension, {})[stat.key] = stat.count
+
+    state = counters.get("state", {})
+    days = counters.get("day", {})
+    chunk_days = counters.get("chunk_day", {})
+    week_ago = _day((now or datetime.now()) - timedelta(days=7))
+
+    return {
+        "articles": {
+            "totals": {
+                "articles": state.get("articles", 0),
+                "processed": state.get("processed", 0),
+                "embedded": state.get("embedded", 0),
+                "recent_week": sum(count for day, count in days.items() if day >= week_ago),
+                "unprocessed": state.get("unprocessed", 0),
+                "unembedded": state.get("unembedded", 0)
+            },
+            "by_topic": counters.get("topic", {}),
+            "by_source": counters.get("source", {}),
+            "date_range": {
+                "oldest": min(days) if days else None,
+                "newest": max(days) if days else None
+            }
+        },
+        "vectors": {
+            "total_vectors": sum(chunk_days.values()),
+            "unique_articles": sum(counters.get("vector_day", {}).values()),
+            "oldest_article": min(chunk_days) if chunk_days else None,
+            "newest_article": max(chunk_days) if chunk_days else None
+        }
+    }
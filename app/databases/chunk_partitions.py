@@ -0,0 +1,189 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, List
+
+from sqlalchemy import text
+
+from app.databases.models import ArticleChunk
+
+# Weekly RANGE partitions of article_chunks on PostgreSQL
+# - Partitions cover [Monday 00:00, next Monday 00:00) and are named
+#   article_chunks_wYYYYMMDD after their first day
+# - They are created on demand before chunks are inserted; existence is read
+#   from the catalog inside the caller's transaction, so a rolled-back insert
+#   never leaves the process believing a partition exists
+# - A DEFAULT partition catches rows for any week whose partition could not be
+#   created, so ingest never fails with "no partition found"
+# - Retention drops whole partitions instead of deleting rows
+# - Converting an existing unpartitioned table is a one-off migration
+#   (python -m app.scripts.migrations.partition_article_chunks), never run at startup
+
+PARTITION_PREFIX = "article_chunks_w"
+PARTITION_DAYS = 7
+DEFAULT_PARTITION = "article_chunks_default"
+
+def week_start(value: datetime) -> datetime:
+    """Monday 00:00 of the week containing value"""
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - timedelta(days=day.weekday())
+
+def partition_name(start: datetime) -> str:
+    return f"{PARTITION_PREFIX}{start:%Y%m%d}"
+
+def is_partitioned(conn) -> bool:
+    """Whether article_chunks exists as a partitioned table"""
+    if conn.dialect.name != "postgresql":
+        return False
+    relkind = conn.execute(text(
+        "SELECT relkind FROM pg_class WHERE oid = to_regclass('article_chunks')"
+    )).scalar()
+    return relkind == "p"
+
+def ensure_chunk_partitions(conn, published_dates: Iterable[datetime]) -> List[str]:
+    """Create the weekly partitions needed to store chunks with these dates"""
+    if not is_partitioned(conn):
+        # SQLite, or a plain table that has not been migrated yet
+        return []
+
+    starts = {partition_name(start): start for start in {week_start(value) for value in published_dates}}
+    if not starts:
+        return []
+    # One catalog read instead of DDL for weeks that already exist
+    missing = conn.execute(text(
+        "SELECT name FROM unnest(CAST(:names AS text[])) AS name WHERE to_regclass(name) IS NULL"
+    ), {"names": sorted(starts)}).scalars().all()
+
+    created = []
+    for name in sorted(missing):
+        start = starts[name]
+        end = start + timedelta(days=PARTITION_DAYS)
+        try:
+            # A savepoint keeps a failed CREATE from aborting the caller's transaction
+            with conn.begin_nested():
+                conn.execute(text(f"""
+                    CREATE TABLE IF NOT EXISTS {name} PARTITION OF article_chunks
+                    FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')
+                """))
+            created.append(name)
+        except Exception as e:
+            # e.g. the default partition already holds rows of this week;
+            # new rows for the week keep going there
+            logging.warning(f"Could not create chunk partition {name}, using {DEFAULT_PARTITION}: {e}")
+
+    return created
+
+def ensure_default_partition(conn) -> bool:
+    """Create the DEFAULT partition of article_chunks if it is missing"""
+    if not is_partitioned(conn):
+        return False
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF article_chunks DEFAULT"))
+    return True
+
+def list_chunk_partitions(conn) -> List[dict]:
+    """Partitions of article_chunks with their date range and estimated row count"""
+    if not is_partitioned(conn):
+        return []
+
+    rows = conn.execute(text("""
+        SELECT c.relname, GREATEST(c.reltuples, 0)::bigint
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'article_chunks'::regclass
+        ORDER BY c.relname
+    """)).all()
+
+    partitions = []
+    for name, row_estimate in rows:
+        if not name.startswith(PARTITION_PREFIX):
+            continue
+        start = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d")
+        partitions.append({
+            "name": name,
+            "start": start,
+            "end": start + timedelta(days=PARTITION_DAYS),
+            "row_estimate": row_estimate
+        })
+    return partitions
+
+def chunk_row_estimate(conn) -> int:
+    """Planner estimate of the rows in article_chunks: summed over every
+    partition (the DEFAULT one included) once partitioned, else the plain table's"""
+    if conn.dialect.name != "postgresql":
+        return 0
+    if is_partitioned(conn):
+        return conn.execute(text("""
+            SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'article_chunks'::regclass
+        """)).scalar()
+    # reltuples is -1 for a table that has never been analyzed
+    return conn.execute(text(
+        "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = to_regclass('article_chunks')"
+    )).scalar() or 0
+
+def drop_chunk_partitions_before(conn, cutoff: datetime) -> dict:
+    """Drop partitions whose whole range is older than cutoff.
+    Row counts come from planner statistics, so they are estimates.
+    """
+    dropped = []
+    rows = 0
+    for partition in list_chunk_partitions(conn):
+        if partition["end"] <= cutoff:
+            conn.execute(text(f"DROP TABLE IF EXISTS {partition['name']}"))
+            dropped.append(partition["name"])
+            rows += partition["row_estimate"]
+
+    if dropped:
+        logging.info(f"Dropped {len(dropped)} expired chunk partitions (~{rows} rows)")
+    return {"partitions": dropped, "rows": rows}
+
+def needs_partition_migration(conn) -> bool:
+    """Whether article_chunks exists as a plain (unpartitioned) PostgreSQL table"""
+    if conn.dialect.name != "postgresql":
+        return False
+    relkind = conn.execute(text(
+        "SELECT relkind FROM pg_class WHERE oid = to_regclass('article_chunks')"
+    )).scalar()
+    return relkind == "r"
+
+def migrate_unpartitioned_chunks(conn) -> int:
+    """Convert an existing plain article_chunks table into the partitioned layout.
+    The old table, its indexes and its id sequence are renamed out of the way,
+    the partitioned table is created, rows are copied and the old table dropped.
+    Rewrites the whole table under exclusive locks: run it from the one-off
+    migration script during a maintenance window. Returns the rows copied.
+    """
+    if not needs_partition_migration(conn):
+        return 0
+
+    source_rows = conn.execute(text("SELECT COUNT(*) FROM article_chunks")).scalar()
+    logging.info(f"Migrating {source_rows} article_chunks rows to weekly partitions...")
+    conn.execute(text("ALTER TABLE article_chunks RENAME TO article_chunks_unpartitioned"))
+    index_names = conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'article_chunks_unpartitioned'"
+    )).scalars().all()
+    for index_name in index_names:
+        conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_unpartitioned"'))
+    conn.execute(text("ALTER SEQUENCE IF EXISTS article_chunks_id_seq RENAME TO article_chunks_unpartitioned_id_seq"))
+
+    ArticleChunk.__table__.create(conn)
+
+    published_dates = conn.execute(text(
+        "SELECT DISTINCT date_trunc('week', published_at) FROM article_chunks_unpartitioned"
+    )).scalars().all()
+    ensure_chunk_partitions(conn, published_dates)
+
+    columns = ", ".join(column.name for column in ArticleChunk.__table__.columns)
+    result = conn.execute(text(
+        f"INSERT INTO article_chunks ({columns}) SELECT {columns} FROM article_chunks_unpartitioned"
+    ))
+    if result.rowcount != source_rows:
+        # Raising rolls the whole migration back, old table included
+        raise RuntimeError(f"Copied {result.rowcount} of {source_rows} chunks, aborting migration")
+    conn.execute(text(
+        "SELECT setval('article_chunks_id_seq', COALESCE((SELECT MAX(id) FROM article_chunks), 0) + 1, false)"
+    ))
+    conn.execute(text("DROP TABLE article_chunks_unpartitioned"))
+    logging.info(f"Moved {result.rowcount} chunks into partitioned article_chunks")
+    return result.rowcount
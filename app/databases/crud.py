@@ -1,26 +1,42 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_, or_, func
+from sqlalchemy.orm import Session, defer
+from sqlalchemy import desc, and_, or_, func, tuple_, select
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import List, Optional, Tuple
+import base64
+from types import SimpleNamespace
+import json
 from .models import NewsArticle
+from .article_search import search_matches
+from .article_neighbors import delete_article_neighbors
+from .article_stats import ARTICLE_STAT_COLUMNS, read_article_stats, record_article_changes, record_articles
 import logging
 from sqlalchemy import or_, and_
 
+# Columns of ArticleResponse; list queries select only these (no body) and
+# return lightweight rows that map straight onto the response model
+FEED_COLUMNS = (
+    NewsArticle.id,
+    NewsArticle.title,
+    NewsArticle.url,
+    NewsArticle.source,
+    NewsArticle.ai_summary,
+    NewsArticle.topic,
+    NewsArticle.published_at,
+)
+
 class NewsService:
     
     @staticmethod
-    def get_articles(
+    def _feed_query(
         db: Session,
-        skip: int = 0,
-        limit: int = 20,
         topic: Optional[str] = None,
         search: Optional[str] = None,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         source: Optional[str] = None
-    ) -> List[NewsArticle]:
-        """Get filtered and paginated articles"""
-        query = db.query(NewsArticle).filter(
+    ):
+        """Processed articles matching the feed filters, as FEED_COLUMNS rows"""
+        query = db.query(*FEED_COLUMNS).filter(
             NewsArticle.is_processed == True,
             NewsArticle.ai_summary.isnot(None)
         )
@@ -30,13 +46,18 @@ class NewsService:
             query = query.filter(NewsArticle.topic == topic)
             
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                or_(
-                    NewsArticle.title.ilike(search_term),
-                    NewsArticle.ai_summary.ilike(search_term)
+            # Feed order stays by date (keyset pagination); the index only filters
+            matches = search_matches(db, search, include_body=False)
+            if matches is not None:
+                query = query.filter(NewsArticle.id.in_(select(matches.c.id)))
+            else:
+                search_term = f"%{search}%"
+                query = query.filter(
+                    or_(
+                        NewsArticle.title.ilike(search_term),
+                        NewsArticle.ai_summary.ilike(search_term)
+                    )
                 )
-            )
             
         if start_date:
             query = query.filter(NewsArticle.published_at >= start_date)
@@ -46,18 +67,81 @@ class NewsService:
             
         if source:
             query = query.filter(NewsArticle.source == source)
+        return query
+
+    @staticmethod
+    def get_articles(
+        db: Session,
+        skip: int = 0,
+        limit: int = 20,
+        topic: Optional[str] = None,
+        search: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        source: Optional[str] = None
+    ) -> list:
+        """Get filtered and paginated articles (offset based; see get_articles_page)"""
+        query = NewsService._feed_query(db, topic, search, start_date, end_date, source)
         
         # Order by date (newest first) and paginate
-        return query.order_by(desc(NewsArticle.published_at)).offset(skip).limit(limit).all()
+        return query.order_by(desc(NewsArticle.published_at), desc(NewsArticle.id)).offset(skip).limit(limit).all()
+
+    @staticmethod
+    def encode_cursor(article) -> str:
+        """Opaque cursor pointing just after an article in feed order"""
+        payload = json.dumps([article.published_at.isoformat(), article.id])
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        """(published_at, id) from a cursor; ValueError if it is malformed"""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            published_at, article_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.fromisoformat(published_at), int(article_id)
+        except Exception as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    @staticmethod
+    def get_articles_page(
+        db: Session,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        topic: Optional[str] = None,
+        search: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        source: Optional[str] = None
+    ) -> Tuple[list, Optional[str]]:
+        """Keyset pagination over (published_at, id), newest first.
+        Each page seeks straight to the cursor position in the idx_feed* indexes,
+        so page N costs the same as page 1. Returns (articles, next cursor or None).
+        """
+        query = NewsService._feed_query(db, topic, search, start_date, end_date, source)
+        if cursor:
+            published_at, article_id = NewsService.decode_cursor(cursor)
+            query = query.filter(
+                tuple_(NewsArticle.published_at, NewsArticle.id) < tuple_(published_at, article_id)
+            )
+        
+        articles = query.order_by(
+            desc(NewsArticle.published_at), desc(NewsArticle.id)
+        ).limit(limit + 1).all()  # one extra to know whether more exist
+        
+        if len(articles) > limit:
+            articles = articles[:limit]
+            return articles, NewsService.encode_cursor(articles[-1])
+        return articles, None
     
     
 
     @staticmethod
-    def get_unprocessed_articles(db: Session, limit: int = 50) -> List[NewsArticle]:
-        """Get articles that need AI processing.
+    def get_unprocessed_articles(db: Session, limit: int = 50, body_chars: Optional[int] = None) -> list:
+        """Get articles that need AI processing, as (id, body) rows.
         Criteria:
           - is_processed is False
           - OR ai_summary exists but contains any known bad snippet
+        body_chars truncates the body in the database when only a prefix is used.
         """
         BAD_SUMMARY_SNIPPETS = [
             # tweak to your exact trigger
@@ -67,23 +151,10 @@ class NewsService:
         bad_summary_filter = or_(
             *[NewsArticle.ai_summary.ilike(f"%{s}%") for s in BAD_SUMMARY_SNIPPETS]
         )
-        result = db.query(NewsArticle).filter(
-                or_(
-                    NewsArticle.is_processed.is_(False),
-                    and_(NewsArticle.ai_summary.isnot(None), bad_summary_filter),
-                )
-            ).order_by(NewsArticle.published_at.asc()).limit(limit).all()
-        
-        print(f"Found {len(result)} unprocessed articles.")
-        # find who has bad summaries
-        bad_summaries = db.query(NewsArticle).filter(
-            NewsArticle.ai_summary.isnot(None),
-            bad_summary_filter
-        ).all()
-        print(f"Of these, {len(bad_summaries)} have bad summaries.")
+        body = func.substr(NewsArticle.body, 1, body_chars) if body_chars else NewsArticle.body
         
         return (
-            db.query(NewsArticle)
+            db.query(NewsArticle.id, body.label("body"))
             .filter(
                 or_(
                     NewsArticle.is_processed.is_(False),
@@ -94,9 +165,6 @@ class NewsService:
             .limit(limit)
             .all()
         )
-        # return db.query(NewsArticle).filter(
-        #     NewsArticle.is_processed == False
-        # ).limit(limit).all()
     
     @staticmethod
     def get_unembedded_articles(db: Session, limit: int = 50) -> List[NewsArticle]:
@@ -115,23 +183,30 @@ class NewsService:
         ai_summary: str
     ):
         """Update article with AI-generated data"""
+        before = db.query(*ARTICLE_STAT_COLUMNS).filter(NewsArticle.id == article_id).first()
         db.query(NewsArticle).filter(NewsArticle.id == article_id).update({
             "topic": topic,
             "ai_summary": ai_summary,
             "is_processed": True,
             "updated_at": datetime.utcnow()
         })
+        if before:
+            after = SimpleNamespace(**{**before._asdict(), "topic": topic, "is_processed": True})
+            record_article_changes(db, [(before, after)])
         db.commit()
     
     @staticmethod
     def mark_articles_as_embedded(db: Session, article_ids: List[int]):
         """Mark articles as having vector embeddings"""
-        db.query(NewsArticle).filter(
-            NewsArticle.id.in_(article_ids)
-        ).update(
+        pending = NewsArticle.id.in_(article_ids), NewsArticle.is_embedded == False
+        rows = db.query(*ARTICLE_STAT_COLUMNS).filter(*pending).all()
+        db.query(NewsArticle).filter(*pending).update(
             {NewsArticle.is_embedded: True, NewsArticle.updated_at: datetime.utcnow()},
             synchronize_session=False
         )
+        record_article_changes(db, [
+            (row, SimpleNamespace(**{**row._asdict(), "is_embedded": True})) for row in rows
+        ])
         db.commit()
     
     @staticmethod
@@ -153,6 +228,8 @@ class NewsService:
         """Create new article"""
         article = NewsArticle(**article_data)
         db.add(article)
+        db.flush()  # applies column defaults (is_processed, is_embedded)
+        record_articles(db, [article])
         db.commit()
         db.refresh(article)
         return article
@@ -170,77 +247,19 @@ class NewsService:
     @staticmethod
     def delete_old_articles(db: Session, cutoff_date: datetime) -> int:
         """Delete articles older than cutoff date"""
-        deleted_count = db.query(NewsArticle).filter(
-            NewsArticle.published_at < cutoff_date
-        ).delete()
+        expired = NewsArticle.published_at < cutoff_date
+        rows = db.query(NewsArticle.id, *ARTICLE_STAT_COLUMNS).filter(expired).all()
+        record_articles(db, rows, sign=-1)
+        delete_article_neighbors(db, [row.id for row in rows])
+        deleted_count = db.query(NewsArticle).filter(expired).delete()
         db.commit()
         return deleted_count
     
     @staticmethod
     def get_article_stats(db: Session) -> dict:
-        """Get comprehensive article statistics"""
+        """Get comprehensive article statistics (from the article_stats counters)"""
         try:
-            # Basic counts
-            total_articles = db.query(NewsArticle).count()
-            processed_articles = db.query(NewsArticle).filter(
-                NewsArticle.is_processed == True
-            ).count()
-            embedded_articles = db.query(NewsArticle).filter(
-                NewsArticle.is_embedded == True
-            ).count()
-            
-            # Recent articles (last 7 days)
-            week_ago = datetime.now() - timedelta(days=7)
-            recent_articles = db.query(NewsArticle).filter(
-                NewsArticle.published_at >= week_ago
-            ).count()
-            
-            # Articles by topic
-            topic_stats = db.query(
-                NewsArticle.topic,
-                func.count(NewsArticle.id).label('count')
-            ).filter(
-                NewsArticle.topic.isnot(None)
-            ).group_by(NewsArticle.topic).all()
-            
-            # Articles by source
-            source_stats = db.query(
-                NewsArticle.source,
-                func.count(NewsArticle.id).label('count')
-            ).group_by(NewsArticle.source).all()
-            
-            # Processing status
-            unprocessed_count = db.query(NewsArticle).filter(
-                NewsArticle.is_processed == False
-            ).count()
-            
-            unembedded_count = db.query(NewsArticle).filter(
-                NewsArticle.is_processed == True,
-                NewsArticle.is_embedded == False
-            ).count()
-            
-            # Date range
-            date_range = db.query(
-                func.min(NewsArticle.published_at).label('oldest'),
-                func.max(NewsArticle.published_at).label('newest')
-            ).first()
-            
-            return {
-                "totals": {
-                    "articles": total_articles,
-                    "processed": processed_articles,
-                    "embedded": embedded_articles,
-                    "recent_week": recent_articles,
-                    "unprocessed": unprocessed_count,
-                    "unembedded": unembedded_count
-                },
-                "by_topic": {topic: count for topic, count in topic_stats},
-                "by_source": {source: count for source, count in source_stats},
-                "date_range": {
-                    "oldest": date_range.oldest.isoformat() if date_range.oldest else None,
-                    "newest": date_range.newest.isoformat() if date_range.newest else None
-                }
-            }
+            return read_article_stats(db)["articles"]
             
         except Exception as e:
             logging.error(f"Error getting article stats: {e}")
@@ -251,11 +270,20 @@ class NewsService:
         db: Session,
         query: str,
         limit: int = 10
-    ) -> List[NewsArticle]:
-        """Search articles by content using database text search"""
+    ) -> list:
+        """Search articles by content, best full-text matches first (FEED_COLUMNS rows)"""
+        matches = search_matches(db, query)
+        if matches is not None:
+            return db.query(*FEED_COLUMNS).join(
+                matches, NewsArticle.id == matches.c.id
+            ).filter(
+                NewsArticle.is_processed == True
+            ).order_by(desc(matches.c.rank), desc(NewsArticle.published_at)).limit(limit).all()
+        
+        # No full-text index on this database
         search_term = f"%{query}%"
         
-        return db.query(NewsArticle).filter(
+        return db.query(*FEED_COLUMNS).filter(
             NewsArticle.is_processed == True,
             or_(
                 NewsArticle.title.ilike(search_term),
@@ -269,7 +297,7 @@ class NewsService:
         """Get recent articles for topic analysis"""
         cutoff_date = datetime.now() - timedelta(days=days_back)
         
-        return db.query(NewsArticle).filter(
+        return db.query(NewsArticle).options(defer(NewsArticle.body)).filter(
             NewsArticle.is_processed == True,
             NewsArticle.published_at >= cutoff_date
         ).order_by(desc(NewsArticle.published_at)).all()
@@ -1,11 +1,16 @@
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Index
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, Boolean, Index, ForeignKey, UniqueConstraint, PrimaryKeyConstraint
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
+from pgvector.sqlalchemy import Vector
 import datetime
 
 Base = declarative_base()
 
+# Dimension of BAAI/bge-small-en-v1.5 embeddings (see get_embedding_model)
+EMBEDDING_DIM = 384
+
 # This is the model for storing news articles in the database
 # Details:
 # - id: Unique identifier for each article
@@ -37,10 +42,105 @@ class NewsArticle(Base):
     ai_summary = Column(Text)  # AI generated summary
     is_processed = Column(Boolean, default=False, index=True)
     is_embedded = Column(Boolean, default=False, index=True) 
+    # When the similar-articles list was last computed; null means never, even
+    # if other articles have offered themselves into its list since
+    neighbors_computed_at = Column(DateTime)
 
     # Performance indexes
+    # idx_feed*: keyset pagination of the news feed, ordered by (published_at, id),
+    # one index per combination of the equality filters (topic, source);
+    # date range filters are ranges on the leading sort column
     __table_args__ = (
         Index('idx_topic_date', 'topic', 'published_at'),
         Index('idx_processed_date', 'is_processed', 'published_at'),
         Index('idx_source_date', 'source', 'published_at'),
-    )
\ No newline at end of file
+        Index('idx_feed', 'is_processed', 'published_at', 'id'),
+        Index('idx_feed_topic', 'topic', 'is_processed', 'published_at', 'id'),
+        Index('idx_feed_source', 'source', 'is_processed', 'published_at', 'id'),
+        Index('idx_feed_topic_source', 'topic', 'source', 'is_processed', 'published_at', 'id'),
+    )
+
+# This is the model for storing embedded article chunks used by semantic search
+# Details:
+# - id: Unique identifier for each chunk
+# - article_id: Article the chunk was split from (deleted together with the article)
+# - chunk_index: Position of the chunk inside the article body
+# - topic / source / published_at: Copied from the article as typed columns so
+#   filtered vector search and retention deletes use btree indexes instead of
+#   scanning JSON metadata
+# - title / url: Copied from the article for building sources in answers
+# - content: Chunk text, whitespace-normalized when the article is split
+# - token_count: Tokens in content, counted once at index time for context packing
+# - embedding: Chunk embedding from the FastEmbed model
+# - On PostgreSQL the table is RANGE partitioned by published_at into weekly
+#   partitions (see app/databases/chunk_partitions.py), so recent-news searches
+#   only touch the hot partitions and expiry drops whole partitions
+class ArticleChunk(Base):
+    __tablename__ = "article_chunks"
+
+    id = Column(Integer, primary_key=True)
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    topic = Column(String(50), nullable=False, index=True)
+    source = Column(String(100), nullable=False, index=True)
+    published_at = Column(DateTime, nullable=False, index=True)
+    title = Column(String(500))
+    url = Column(String(1000))
+    content = Column(Text, nullable=False)
+    token_count = Column(Integer)
+    embedding = Column(Vector(EMBEDDING_DIM), nullable=False)
+    created_at = Column(DateTime, default=func.now())
+
+    # Performance indexes for the filter combinations used by semantic search
+    # Unique keys of a partitioned table must contain the partition key
+    __table_args__ = (
+        UniqueConstraint('article_id', 'chunk_index', 'published_at', name='uq_chunk_article_index'),
+        Index('idx_chunk_topic_date', 'topic', 'published_at'),
+        Index('idx_chunk_source_date', 'source', 'published_at'),
+        {
+            'postgresql_partition_by': 'RANGE (published_at)',
+            'info': {'partition_key': 'published_at'},
+        },
+    )
+
+# This is the model for precomputed "similar articles" lists
+# Details:
+# - article_id / neighbor_id: An article and one of its nearest articles
+#   (both deleted together with either article)
+# - distance: Cosine distance between the article's mean chunk embedding and
+#   the neighbor's closest chunk, lower is closer
+# - Written when an article is embedded (see app/databases/article_neighbors.py)
+#   so the article detail page needs no embedding or vector search
+class ArticleNeighbor(Base):
+    __tablename__ = "article_neighbors"
+
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+    neighbor_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True, index=True)
+    distance = Column(Float, nullable=False)
+
+# This is the model for the incrementally maintained statistics behind /api/stats
+# Details:
+# - dimension: What is counted: "state" (totals per processing state), "topic",
+#   "source", "day" (articles per publication day), "chunk_day" / "vector_day"
+#   (chunks and embedded articles per publication day)
+# - key: Value within the dimension (topic name, YYYY-MM-DD, ...)
+# - count: Current count, adjusted in the same transaction as the write that
+#   changes it (see app/databases/article_stats.py)
+class ArticleStat(Base):
+    __tablename__ = "article_stats"
+
+    dimension = Column(String(20), primary_key=True)
+    key = Column(String(200), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+# PostgreSQL requires the partition key in the primary key of a partitioned
+# table. The ORM identity stays (id) so SQLite keeps its INTEGER PRIMARY KEY.
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _compile_partitioned_primary_key(constraint, compiler, **kw):
+    partition_key = constraint.table.info.get("partition_key")
+    if not partition_key:
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+
+    columns = [compiler.preparer.quote(column.name) for column in constraint.columns]
+    columns.append(compiler.preparer.quote(partition_key))
+    return "PRIMARY KEY (%s)" % ", ".join(columns)
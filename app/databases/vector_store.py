@@ -0,0 +1,303 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Integer, cast, column, func, select, text, true, tuple_, values
+from sqlalchemy.orm import aliased
+
+from app.databases.database import SessionLocal
+from app.databases.chunk_partitions import ensure_chunk_partitions
+from app.databases.models import ArticleChunk, EMBEDDING_DIM
+from app.databases.article_stats import chunk_day_counts, read_article_stats, record_chunks
+
+# Vector store over the typed article_chunks table
+# Exposes the subset of the LangChain PGVector interface used by the app
+# (add_texts / similarity_search_with_score) so retrieval code keeps working,
+# but filters and deletes go through indexed columns instead of JSONB metadata
+class ChunkVectorStore:
+
+    # Filter keys accepted by similarity_search_with_score
+    FILTER_COLUMNS = {
+        "article_id": ArticleChunk.article_id,
+        "topic": ArticleChunk.topic,
+        "source": ArticleChunk.source,
+    }
+    # Publication window filters; these let PostgreSQL prune weekly partitions
+    RANGE_FILTERS = {
+        "published_after": lambda value: ArticleChunk.published_at >= value,
+        "published_before": lambda value: ArticleChunk.published_at < value,
+    }
+
+    # HNSW candidate list bounds; filtered searches discard candidates that fail
+    # the WHERE clause after the index scan, so they get a wider list
+    MIN_EF_SEARCH = 40
+    MAX_EF_SEARCH = 1000
+    FILTERED_EF_FACTOR = 4
+
+    def __init__(self, embedding_function, session_factory=SessionLocal, lexical_index=None):
+        self.embeddings = embedding_function
+        self.session_factory = session_factory
+        # Optional BM25Index kept in sync by VectorService, used for hybrid retrieval
+        self.lexical_index = lexical_index
+
+    def _tune_search(self, db, k: int, filtered: bool, ef_search: Optional[int], exact: bool):
+        """Set per-transaction pgvector search parameters"""
+        if db.get_bind().dialect.name != "postgresql":
+            return
+
+        if exact:
+            # Force the sequential scan so results are exact (used for benchmarking recall)
+            db.execute(text("SET LOCAL enable_indexscan = off"))
+            return
+
+        if ef_search is None:
+            ef_search = max(self.MIN_EF_SEARCH, k * 2)
+            if filtered:
+                ef_search *= self.FILTERED_EF_FACTOR
+        ef_search = min(int(ef_search), self.MAX_EF_SEARCH)
+        # SET does not take bind parameters; ef_search is a validated int
+        db.execute(text(f"SET LOCAL hnsw.ef_search = {ef_search}"))
+
+    def _apply_filter(self, query, filter: Optional[Dict]):
+        """Apply equality / IN filters on typed chunk columns"""
+        if not filter:
+            return query
+
+        for key, value in filter.items():
+            if key in self.RANGE_FILTERS:
+                query = query.filter(self.RANGE_FILTERS[key](value))
+                continue
+
+            column = self.FILTER_COLUMNS.get(key)
+            if column is None:
+                raise ValueError(f"Unsupported vector filter: {key}")
+            if isinstance(value, (list, tuple, set)):
+                query = query.filter(column.in_(list(value)))
+            else:
+                query = query.filter(column == value)
+        return query
+
+    @staticmethod
+    def _to_document(chunk: ArticleChunk) -> Document:
+        return Document(
+            page_content=chunk.content,
+            metadata={
+                "article_id": chunk.article_id,
+                "title": chunk.title,
+                "topic": chunk.topic,
+                "source": chunk.source,
+                "url": chunk.url,
+                "published_at": chunk.published_at.isoformat(),
+                "chunk_index": chunk.chunk_index,
+                "token_count": chunk.token_count,
+            }
+        )
+
+    def add_texts(self, texts: List[str], metadatas: List[Dict], embeddings=None) -> List[int]:
+        """Insert texts as chunks, embedding them unless embeddings are given;
+        metadata must carry the typed columns"""
+        if embeddings is None:
+            embeddings = self.embeddings.embed_documents(list(texts))
+
+        db = self.session_factory()
+        try:
+            chunks = []
+            for content, metadata, embedding in zip(texts, metadatas, embeddings):
+                published_at = metadata["published_at"]
+                if isinstance(published_at, str):
+                    published_at = datetime.fromisoformat(published_at)
+
+                chunks.append(ArticleChunk(
+                    article_id=int(metadata["article_id"]),
+                    chunk_index=metadata["chunk_index"],
+                    topic=metadata.get("topic") or "General",
+                    source=metadata["source"],
+                    published_at=published_at,
+                    title=metadata.get("title"),
+                    url=metadata.get("url"),
+                    content=content,
+                    token_count=metadata.get("token_count"),
+                    embedding=embedding,
+                ))
+
+            ensure_chunk_partitions(db.connection(), [chunk.published_at for chunk in chunks])
+            db.add_all(chunks)
+            day_articles = {}
+            for chunk in chunks:
+                day_articles.setdefault(chunk.published_at.strftime("%Y-%m-%d"), []).append(chunk.article_id)
+            record_chunks(db, {
+                day: (len(article_ids), len(set(article_ids))) for day, article_ids in day_articles.items()
+            })
+            db.commit()
+            return [chunk.id for chunk in chunks]
+        finally:
+            db.close()
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding,
+        k: int = 4,
+        filter: Optional[Dict] = None,
+        ef_search: Optional[int] = None,
+        exact: bool = False,
+        with_embeddings: bool = False
+    ) -> List[Tuple]:
+        """Nearest chunks to an embedding, scored by cosine distance (lower is closer)"""
+        db = self.session_factory()
+        try:
+            self._tune_search(db, k, bool(filter), ef_search, exact)
+            distance = ArticleChunk.embedding.cosine_distance(embedding).label("distance")
+            query = self._apply_filter(db.query(ArticleChunk, distance), filter)
+            rows = query.order_by(distance).limit(k).all()
+            return self._to_results(rows, with_embeddings)
+        finally:
+            db.close()
+
+    def similarity_search_by_vectors_with_score(
+        self,
+        embeddings: List,
+        k: int = 4,
+        filter: Optional[Dict] = None,
+        with_embeddings: bool = False
+    ) -> List[List[Tuple]]:
+        """Nearest chunks for several embeddings in one statement (one result list per embedding).
+        On PostgreSQL the query vectors are a VALUES list joined LATERAL to a
+        top-k index scan, so a batch costs one round trip; other databases
+        run one search per embedding."""
+        if not embeddings:
+            return []
+
+        db = self.session_factory()
+        try:
+            if db.get_bind().dialect.name != "postgresql":
+                results = []
+                for embedding in embeddings:
+                    distance = ArticleChunk.embedding.cosine_distance(embedding).label("distance")
+                    query = self._apply_filter(db.query(ArticleChunk, distance), filter)
+                    results.append(self._to_results(query.order_by(distance).limit(k).all(), with_embeddings))
+                return results
+
+            self._tune_search(db, k, bool(filter), None, False)
+            queries = values(
+                column("query_index", Integer),
+                column("query_embedding", Vector(EMBEDDING_DIM)),
+                name="queries"
+            ).data([(i, embedding) for i, embedding in enumerate(embeddings)])
+            # VALUES parameters arrive untyped; cast so <=> and the HNSW index apply
+            query_embedding = cast(queries.c.query_embedding, Vector(EMBEDDING_DIM))
+            distance = ArticleChunk.embedding.cosine_distance(query_embedding).label("distance")
+            nearest = self._apply_filter(select(ArticleChunk, distance), filter).order_by(distance).limit(k).lateral("nearest")
+            chunk = aliased(ArticleChunk, nearest)
+            rows = db.query(queries.c.query_index, chunk, nearest.c.distance).select_from(queries).join(
+                nearest, true()
+            ).order_by(queries.c.query_index, nearest.c.distance).all()
+
+            grouped = [[] for _ in embeddings]
+            for query_index, chunk_row, score in rows:
+                grouped[query_index].append((chunk_row, score))
+            return [self._to_results(group, with_embeddings) for group in grouped]
+        finally:
+            db.close()
+
+    def _to_results(self, rows, with_embeddings: bool) -> List[Tuple]:
+        """(document, distance) pairs, or (document, distance, embedding) triples"""
+        if with_embeddings:
+            return [(self._to_document(chunk), float(score), chunk.embedding) for chunk, score in rows]
+        return [(self._to_document(chunk), float(score)) for chunk, score in rows]
+
+    def get_chunks(self, keys: List[Tuple[int, int]]) -> List[Tuple]:
+        """Fetch chunks by (article_id, chunk_index) as (document, embedding) pairs"""
+        if not keys:
+            return []
+
+        db = self.session_factory()
+        try:
+            rows = db.query(ArticleChunk).filter(
+                tuple_(ArticleChunk.article_id, ArticleChunk.chunk_index).in_(keys)
+            ).all()
+            return [(self._to_document(chunk), chunk.embedding) for chunk in rows]
+        finally:
+            db.close()
+
+    def get_chunks_with_score(
+        self,
+        embedding,
+        keys: List[Tuple[int, int]],
+        with_embeddings: bool = False
+    ) -> List[Tuple]:
+        """Fetch chunks by (article_id, chunk_index) with their distance to an embedding"""
+        if not keys:
+            return []
+
+        db = self.session_factory()
+        try:
+            distance = ArticleChunk.embedding.cosine_distance(embedding).label("distance")
+            rows = db.query(ArticleChunk, distance).filter(
+                tuple_(ArticleChunk.article_id, ArticleChunk.chunk_index).in_(keys)
+            ).all()
+            return self._to_results(rows, with_embeddings)
+        finally:
+            db.close()
+
+    def iter_chunk_texts(self, batch_size: int = 1000):
+        """Yield (article_id, chunk_index, published_at, content) for every chunk"""
+        db = self.session_factory()
+        try:
+            query = db.query(
+                ArticleChunk.article_id,
+                ArticleChunk.chunk_index,
+                ArticleChunk.published_at,
+                ArticleChunk.content
+            ).yield_per(batch_size)
+            for row in query:
+                yield tuple(row)
+        finally:
+            db.close()
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict] = None
+    ) -> List[Tuple[Document, float]]:
+        """Embed the query and return the k nearest chunks with their distances"""
+        embedding = self.embeddings.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)
+
+    def delete_by_article_ids(self, article_ids: List[int]) -> int:
+        """Delete all chunks of the given articles"""
+        if not article_ids:
+            return 0
+
+        db = self.session_factory()
+        try:
+            record_chunks(db, chunk_day_counts(db, ArticleChunk.article_id.in_(article_ids)), sign=-1)
+            deleted = db.query(ArticleChunk).filter(
+                ArticleChunk.article_id.in_(article_ids)
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    def delete_older_than(self, cutoff_date: datetime) -> int:
+        """Delete chunks of articles published before the cutoff date"""
+        db = self.session_factory()
+        try:
+            record_chunks(db, chunk_day_counts(db, ArticleChunk.published_at < cutoff_date), sign=-1)
+            deleted = db.query(ArticleChunk).filter(
+                ArticleChunk.published_at < cutoff_date
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    def get_stats(self) -> Dict:
+        """Chunk and article counts plus the published_at range (day resolution, from article_stats)"""
+        db = self.session_factory()
+        try:
+            return read_article_stats(db)["vectors"]
+        finally:
+            db.close()
@@ -0,0 +1,139 @@
+# app/infra/concurrency.py
+import asyncio
+import contextlib
+import inspect
+import os
+import time
+from collections import deque
+
+class StageTimeoutError(Exception):
+    """A pipeline stage did not finish (including queueing) within its timeout"""
+    def __init__(self, stage, timeout):
+        super().__init__(f"{stage} timed out after {timeout}s")
+        self.stage = stage
+        self.timeout = timeout
+
+class Stage:
+    """
+    Concurrency limit + timeout for one stage of the RAG pipeline.
+    Blocking calls run in the default thread pool, so the event loop stays free;
+    the semaphore bounds how many run at once (and how many DB connections,
+    threads or upstream API calls the stage can hold). Time spent waiting for
+    a slot counts toward the timeout, so overload sheds requests instead of
+    queueing them forever. A worker thread that outlives its timeout keeps its
+    slot until it returns, so the bound holds for abandoned calls too.
+    """
+    def __init__(self, name, limit, timeout):
+        self.name = name
+        self.limit = limit
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.latencies_ms = deque(maxlen=1000)  # recent completed calls
+
+    async def _guarded(self, awaitable):
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await awaitable
+            finally:
+                self.in_flight -= 1
+
+    async def run_async(self, coro):
+        """Await a coroutine under this stage's limit and timeout"""
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self._guarded(coro), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise StageTimeoutError(self.name, self.timeout)
+        finally:
+            # Cancelled or timed out while still waiting for a slot
+            if inspect.getcoroutinestate(coro) == inspect.CORO_CREATED:
+                coro.close()
+        self.latencies_ms.append((time.perf_counter() - start) * 1000)
+        return result
+
+    def _release_thread_slot(self, task):
+        self.in_flight -= 1
+        self._semaphore.release()
+        if not task.cancelled():
+            # Retrieve the exception of abandoned calls so asyncio does not log it
+            task.exception()
+
+    async def run_sync(self, fn, *args, **kwargs):
+        """Run a blocking callable in a worker thread under this stage's limit and timeout.
+        On timeout the thread is abandoned, not killed; its result is discarded
+        and its slot is released only when it returns."""
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise StageTimeoutError(self.name, self.timeout)
+        self.in_flight += 1
+        task = asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs))
+        task.add_done_callback(self._release_thread_slot)
+
+        remaining = self.timeout - (time.perf_counter() - start)
+        try:
+            # shield: a timeout or cancellation here must not release the slot early
+            result = await asyncio.wait_for(asyncio.shield(task), timeout=max(remaining, 0))
+        except asyncio.TimeoutError:
+            raise StageTimeoutError(self.name, self.timeout)
+        self.latencies_ms.append((time.perf_counter() - start) * 1000)
+        return result
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Hold a slot for streaming work; only the wait for the slot is time-limited"""
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise StageTimeoutError(self.name, self.timeout)
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            self.latencies_ms.append((time.perf_counter() - start) * 1000)
+
+    async def stream(self, agen):
+        """Iterate an async generator while holding a slot. Waiting for the slot
+        and the stream itself are each limited by this stage's timeout."""
+        async with self.slot():
+            deadline = time.perf_counter() + self.timeout
+            try:
+                while True:
+                    remaining = deadline - time.perf_counter()
+                    try:
+                        item = await asyncio.wait_for(agen.__anext__(), timeout=max(remaining, 0))
+                    except StopAsyncIteration:
+                        return
+                    except asyncio.TimeoutError:
+                        raise StageTimeoutError(self.name, self.timeout)
+                    yield item
+            finally:
+                await agen.aclose()
+
+    def get_stats(self):
+        ordered = sorted(self.latencies_ms)
+        percentile = lambda p: round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 2) if ordered else None
+        return {
+            "limit": self.limit,
+            "timeout": self.timeout,
+            "in_flight": self.in_flight,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+        }
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+# Pipeline stages, tunable per deployment through the environment
+EMBED_STAGE = Stage("embed", _env_int("EMBED_CONCURRENCY", 4), _env_int("EMBED_TIMEOUT", 10))
+VECTOR_STAGE = Stage("vector_search", _env_int("VECTOR_CONCURRENCY", 8), _env_int("VECTOR_TIMEOUT", 10))
+WEB_SEARCH_STAGE = Stage("web_search", _env_int("WEB_SEARCH_CONCURRENCY", 4), _env_int("WEB_SEARCH_TIMEOUT", 15))
+LLM_STAGE = Stage("llm", _env_int("LLM_CONCURRENCY", 8), _env_int("LLM_TIMEOUT", 60))
+
+PIPELINE_STAGES = [EMBED_STAGE, VECTOR_STAGE, WEB_SEARCH_STAGE, LLM_STAGE]
@@ -0,0 +1,87 @@
+# app/infra/response_cache.py
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+class ResponseCache:
+    """
+    In-process cache of JSON responses for read-mostly endpoints.
+    Entries live until the data behind them changes: the background jobs call
+    invalidate() after ingest, AI processing and cleanup. The TTL only bounds
+    staleness for changes made outside this process (scripts, other workers).
+    Each entry carries a strong ETag so clients revalidate with If-None-Match
+    and get an empty 304 while nothing changed.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float = 3600):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[float, str, bytes]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _etag(body: bytes) -> str:
+        return f'"{hashlib.sha1(body).hexdigest()}"'
+
+    def get(self, key: str, compute: Callable[[], Any]) -> Tuple[str, bytes]:
+        """(etag, JSON body) for key, computed on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+            generation = self._generation
+
+        body = json.dumps(jsonable_encoder(compute()), separators=(",", ":")).encode()
+        etag = self._etag(body)
+        with self._lock:
+            # Not stored if the data changed while it was being computed
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic(), etag, body)
+        return etag, body
+
+    def respond(self, request: Request, key: str, compute: Callable[[], Any]) -> Response:
+        """Cached JSON response, or 304 when the client already has this version"""
+        etag, body = self.get(key, compute)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in {tag.strip() for tag in if_none_match.split(",")} or if_none_match.strip() == "*":
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=JSONResponse.media_type, headers=headers)
+
+    def invalidate(self, reason: str = ""):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+        if reason:
+            logging.info(f"{self.name} cache invalidated ({reason})")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "invalidations": self.invalidations,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+# /api/topics, /api/sources and /api/trending change only when articles do
+catalog_cache = ResponseCache("catalog")
@@ -0,0 +1,98 @@
+# app/infra/singleflight.py
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+class _Broadcast:
+    """Events of one streamed execution, replayed to late subscribers"""
+    def __init__(self):
+        self.events = []
+        self.done = False
+        self.error = None
+        self.task = None  # the pump task, referenced while it runs
+        self._condition = asyncio.Condition()
+
+    async def publish(self, event):
+        async with self._condition:
+            self.events.append(event)
+            self._condition.notify_all()
+
+    async def close(self, error=None):
+        async with self._condition:
+            self.done = True
+            self.error = error
+            self._condition.notify_all()
+
+    async def subscribe(self):
+        position = 0
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(lambda: position < len(self.events) or self.done)
+                batch = self.events[position:]
+                finished = self.done
+            position += len(batch)
+            for event in batch:
+                yield event
+            if finished and position >= len(self.events):
+                if self.error is not None:
+                    raise self.error
+                return
+
+class SingleFlight:
+    """
+    Coalesces concurrent executions with the same key: the first caller starts
+    the work, later callers with the same key wait for (or stream) its result
+    instead of starting their own. The work runs in its own task, so a caller
+    that disconnects does not cancel it for the others. Keys are released when
+    the work finishes; later requests go through the normal caches.
+    """
+    def __init__(self, name):
+        self.name = name
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() once per key among concurrent callers"""
+        task = self._calls.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shield: cancelling one waiter must not cancel the shared task
+        return await asyncio.shield(task)
+
+    async def stream(self, key: str, fn: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """Iterate fn() once per key; every concurrent caller receives all its events"""
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            self.executions += 1
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.create_task(self._pump(key, fn, broadcast))
+        else:
+            self.coalesced += 1
+
+        async for event in broadcast.subscribe():
+            yield event
+
+    async def _pump(self, key, fn, broadcast):
+        error = None
+        try:
+            async for event in fn():
+                await broadcast.publish(event)
+        except Exception as e:
+            error = e
+        finally:
+            self._streams.pop(key, None)
+            await broadcast.close(error)
+
+    def get_stats(self):
+        return {
+            "in_flight": len(self._calls) + len(self._streams),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Depends, Query, HTTPException
+from fastapi import FastAPI, Depends, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
@@ -6,12 +6,22 @@ from typing import Optional, List
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 import json
+import logging
 import asyncio
-from app.scripts.Main.answer import answer_question, answer_question_stream
-from app.databases.database import get_db, create_tables
-from app.databases.crud import NewsService
+from app.scripts.Main.answer import answer_question_async, answer_question_stream, answer_questions_batch
+from app.infra.concurrency import PIPELINE_STAGES, StageTimeoutError
+from app.infra.singleflight import SingleFlight
+from app.infra.response_cache import catalog_cache
+from app.scripts.utils.normalize_query import normalize_query
+from app.scripts.agents.speculative_search import speculation_policy
+from app.scripts.agents.web_search_agent import web_search_cache
+from app.scripts.agents.model_router import model_router
+from app.databases.database import get_db, create_tables, SessionLocal
+from app.databases.crud import FEED_COLUMNS, NewsService
+from app.databases.article_stats import ensure_article_stats, read_article_stats
+from app.databases.article_neighbors import get_neighbor_articles
 from app.services.background_tasks import BackgroundTaskService
-from app.schemas import QuestionRequest
+from app.schemas import QuestionRequest, BatchQuestionRequest
 from datetime import datetime, date
 from app.services.vector_service import VectorService
 from app.databases.models import NewsArticle
@@ -19,6 +29,10 @@ from app.databases.models import NewsArticle
 # Initialize vector service
 vector_service = VectorService()
 
+# Identical questions asked concurrently share one pipeline execution
+ask_flights = SingleFlight("ask")
+ask_stream_flights = SingleFlight("ask_stream")
+
 # Pydantic models
 class ArticleResponse(BaseModel):
     id: int
@@ -37,6 +51,7 @@ class NewsListResponse(BaseModel):
     total_count: int
     page: int
     has_more: bool
+    next_cursor: Optional[str] = None
 
 class SimilarArticleResponse(BaseModel):
     article: ArticleResponse
@@ -79,10 +94,21 @@ background_service = BackgroundTaskService(vector_service=vector_service)
 @app.on_event("startup")
 async def startup_event():
     create_tables()
+    with SessionLocal() as db:
+        ensure_article_stats(db)
+    vector_service.backfill_from_langchain()
+    vector_service.ensure_ann_index()
+    vector_service.build_lexical_index()
     background_service.start()
+    # One vector search per article without a neighbor list; runs behind startup
+    app.state.neighbor_backfill = asyncio.create_task(background_service.backfill_article_neighbors())
     await background_service.fetch_and_process_news()
     await background_service.process_pending_articles()
     await background_service.process_vectors_for_articles()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    web_search_cache.flush()
 # =============================================================================
 # API ENDPOINTS
 # =============================================================================
@@ -104,12 +130,11 @@ async def get_news(
     source: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None, description="Start date for filtering (YYYY-MM-DD)"),
     end_date: Optional[date] = Query(None, description="End date for filtering (YYYY-MM-DD)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     db: Session = Depends(get_db)
 ):
     """Get paginated news articles with filtering"""
     
-    skip = (page - 1) * limit
-     # Convert dates to datetime for database filtering
     start_datetime = None
     end_datetime = None
     
@@ -120,15 +145,35 @@ async def get_news(
         # Set to end of day to include all articles from that day
         end_datetime = datetime.combine(end_date, datetime.max.time())
     
-    articles = NewsService.get_articles(
-        db=db,
-        skip=skip,
-        limit=limit + 1,  # Get one extra to check if more exist
+    filters = dict(
         topic=topic,
         search=search,
         start_date=start_datetime,
         end_date=end_datetime,
-        source=source, 
+        source=source,
+    )
+    
+    # Keyset pagination: first page, or any page reached through next_cursor
+    if cursor or page == 1:
+        try:
+            articles, next_cursor = NewsService.get_articles_page(db=db, limit=limit, cursor=cursor, **filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return NewsListResponse(
+            articles=articles,
+            total_count=len(articles),
+            page=page,
+            has_more=next_cursor is not None,
+            next_cursor=next_cursor
+        )
+    
+    # Legacy offset pagination for clients still sending page > 1
+    skip = (page - 1) * limit
+    articles = NewsService.get_articles(
+        db=db,
+        skip=skip,
+        limit=limit + 1,  # Get one extra to check if more exist
+        **filters
     )
     
     has_more = len(articles) > limit
@@ -139,18 +184,30 @@ async def get_news(
         articles=articles,
         total_count=len(articles),
         page=page,
-        has_more=has_more
+        has_more=has_more,
+        next_cursor=NewsService.encode_cursor(articles[-1]) if has_more else None
     )
 
 @app.get("/api/topics")
-async def get_topics(db: Session = Depends(get_db)):
+async def get_topics(request: Request, db: Session = Depends(get_db)):
     """Get available topics for filtering"""
-    topics = NewsService.get_available_topics(db)
-    return {"topics": ["All"] + topics}
+    return catalog_cache.respond(
+        request, "topics", lambda: {"topics": ["All"] + NewsService.get_available_topics(db)}
+    )
 
 @app.post("/ask")
 async def ask_question(req: QuestionRequest):
-    result = answer_question(req.question, vector_store=vector_service._get_vector_store())
+    try:
+        result = await ask_flights.do(
+            normalize_query(req.question),
+            lambda: answer_question_async(
+                req.question,
+                vector_store=vector_service._get_vector_store(),
+                answer_cache=vector_service.answer_cache
+            )
+        )
+    except StageTimeoutError as e:
+        raise HTTPException(status_code=504, detail=f"Answer pipeline timed out: {e}")
     return result
 
 # New streaming endpoint
@@ -165,9 +222,18 @@ async def ask_question_stream(req: QuestionRequest):
             await asyncio.sleep(0.1)
             
             # Stream the answer generation process
-            async for update in answer_question_stream(req.question, vector_store=vector_service._get_vector_store()):
+            # Concurrent identical questions get the same token stream
+            async for update in ask_stream_flights.stream(
+                normalize_query(req.question),
+                lambda: answer_question_stream(
+                    req.question,
+                    vector_store=vector_service._get_vector_store(),
+                    answer_cache=vector_service.answer_cache
+                )
+            ):
                 yield f"data: {json.dumps(update)}\n\n"
-                await asyncio.sleep(0.01)  # Small delay to prevent overwhelming
+                if update.get('type') != 'token':
+                    await asyncio.sleep(0.01)  # Small delay to prevent overwhelming
                 
         except Exception as e:
             error_data = {
@@ -189,24 +255,45 @@ async def ask_question_stream(req: QuestionRequest):
         }
     )
 
+@app.post("/ask/batch")
+async def ask_questions_batch(req: BatchQuestionRequest):
+    """Answer many questions with shared retrieval.
+    Streams one JSON object per line as each answer completes; "index" is the
+    question's position in the request."""
+    
+    async def generate():
+        try:
+            async for result in answer_questions_batch(
+                req.questions,
+                vector_store=vector_service._get_vector_store(),
+                answer_cache=vector_service.answer_cache
+            ):
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": f"Error: {str(e)}"}) + "\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 @app.get("/api/stats")
 async def get_system_stats(db: Session = Depends(get_db)):
     """Get comprehensive system statistics"""
     try:
-        # Get article stats from database
-        article_stats = NewsService.get_article_stats(db)
-        
-        # Get vector stats
-        vector_stats = vector_service.get_vector_stats()
+        # Article and vector counters in one read of article_stats
+        stats = read_article_stats(db)
         
         # Get background task status
-        system_status = await background_service.get_system_status()
+        system_status = await background_service.get_system_status(stats)
         
         return {
-            "articles": article_stats,
-            "vectors": vector_stats,
+            "articles": stats["articles"],
+            "vectors": stats["vectors"],
             "system": system_status,
+            "pipeline": {stage.name: stage.get_stats() for stage in PIPELINE_STAGES},
+            "speculative_web_search": speculation_policy.get_stats(),
+            "coalescing": {flights.name: flights.get_stats() for flights in (ask_flights, ask_stream_flights)},
+            "web_search_cache": web_search_cache.get_stats(),
+            "model_routes": model_router.get_stats(),
+            "catalog_cache": catalog_cache.get_stats(),
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -214,18 +301,23 @@ async def get_system_stats(db: Session = Depends(get_db)):
 
 @app.get("/api/trending")
 async def get_trending_topics(
+    request: Request,
     days: int = Query(7, ge=1, le=30),
     db: Session = Depends(get_db)
 ):
     """Get trending topics in recent articles"""
-    trending = NewsService.get_trending_topics(db, days_back=days)
-    return {"trending_topics": trending, "period_days": days}
+    return catalog_cache.respond(
+        request,
+        f"trending:{days}",
+        lambda: {"trending_topics": NewsService.get_trending_topics(db, days_back=days), "period_days": days}
+    )
 
 @app.get("/api/sources")
-async def get_available_sources(db: Session = Depends(get_db)):
+async def get_available_sources(request: Request, db: Session = Depends(get_db)):
     """Get available news sources"""
-    sources = NewsService.get_available_sources(db)
-    return {"sources": sources}
+    return catalog_cache.respond(
+        request, "sources", lambda: {"sources": NewsService.get_available_sources(db)}
+    )
 
 @app.post("/api/search/semantic")
 async def semantic_search(
@@ -274,25 +366,26 @@ async def trigger_cleanup(
 ):
     """Manually trigger cleanup of old content"""
     try:
-        db = SessionLocal()
-        
-        # Count what will be deleted
         cutoff_date = datetime.now() - timedelta(days=days_old)
-        old_articles_count = db.query(NewsArticle).filter(
-            NewsArticle.published_at < cutoff_date
-        ).count()
-        
-        db.close()
         
         # Perform cleanup
-        await background_service.cleanup_old_content()
+        report = await background_service.cleanup_old_content(
+            article_retention_days=days_old,
+            vector_retention_days=days_old
+        )
+        if "error" in report:
+            raise HTTPException(status_code=500, detail=f"Cleanup error: {report['error']}")
         
         return {
             "message": f"Cleanup completed",
             "cutoff_date": cutoff_date.isoformat(),
-            "articles_affected": old_articles_count
+            "articles_affected": report["deleted_articles"],
+            "vectors_affected": report["deleted_vectors"] + report["dropped_vectors"],
+            "bytes_reclaimed": report["bytes_reclaimed"]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Cleanup error: {str(e)}")
 
@@ -313,30 +406,16 @@ async def get_article_detail(
         "similar_articles": []
     }
     
-    # Optionally find similar articles using vector search
-    if include_similar and article.is_embedded:
+    # Similar articles come from the neighbor lists stored at embedding time
+    if include_similar:
         try:
-            # Use article title and summary for similarity search
-            search_query = f"{article.title} {article.ai_summary or ''}"
-            similar_results = await vector_service.search_similar_articles(
-                query=search_query,
-                k=6  # Get 6 to exclude the original article
-            )
-            
-            # Filter out the original article and convert to response format
-            similar_articles = []
-            for result in similar_results:
-                if result["metadata"].get("article_id") != article_id:
-                    similar_article = NewsService.get_article_by_id(
-                        db, int(result["metadata"]["article_id"])
-                    )
-                    if similar_article:
-                        similar_articles.append({
-                            "article": ArticleResponse.from_orm(similar_article),
-                            "similarity_score": result["similarity_score"]
-                        })
-            
-            response["similar_articles"] = similar_articles[:5]  # Return top 5
+            response["similar_articles"] = [
+                {
+                    "article": ArticleResponse.from_orm(row),
+                    "similarity_score": row.distance
+                }
+                for row in get_neighbor_articles(db, article_id, limit=5, columns=FEED_COLUMNS)
+            ]
             
         except Exception as e:
             logging.error(f"Error finding similar articles: {e}")
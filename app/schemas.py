@@ -1,4 +1,9 @@
-from pydantic import BaseModel
+from typing import List
+
+from pydantic import BaseModel, Field
 
 class QuestionRequest(BaseModel):
-    question: str
\ No newline at end of file
+    question: str
+
+class BatchQuestionRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=50)
@@ -1,12 +1,17 @@
 import os
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-from app.scripts.retrieval.chromadb_retriever import retrieve_chunks
+from app.scripts.retrieval.chromadb_retriever import retrieve_chunks, retrieve_chunks_batch
 from app.scripts.prompts.build_prompt import build_local_prompt
 from app.scripts.prompts.build_prompt import build_web_prompt
-from app.scripts.agents.web_search_agent import run_web_search
-from app.scripts.agents.llm_client import generate_llm_answer
+from app.scripts.agents.web_search_agent import run_web_search_async
+from app.scripts.agents.speculative_search import start_speculative_search, resolve_web_search, cancel_speculative_search
+from app.scripts.agents.model_router import model_router
+from app.infra.concurrency import EMBED_STAGE, VECTOR_STAGE, WEB_SEARCH_STAGE, LLM_STAGE
 from app.scripts.utils.should_fallback_to_web import should_fallback_to_web
+from app.scripts.utils.merge_article_chunks import merge_article_chunks
+from app.scripts.utils.compress_context import compress_articles
+from app.scripts.utils.count_tokens import count_tokens, truncate_to_tokens
 import time
 import asyncio
 import re
@@ -14,25 +19,38 @@ import re
 # Global singleton cache
 # vector_store = chromadb_retriever()
 
-def estimate_tokens(text):
-    """Rough token estimation: ~3.5 characters per token for English"""
-    return len(text) / 3.5
+# Budget for extractive compression; well under max_tokens since only the
+# sentences closest to the question are kept
+COMPRESSED_MAX_TOKENS = 2500
 
-def build_optimized_context(chunks, max_tokens=6000, min_chunk_tokens=25):
+def build_optimized_context(
+    chunks,
+    max_tokens=6000,
+    min_chunk_tokens=25,
+    question_embedding=None,
+    embedding_function=None,
+    compressed_max_tokens=COMPRESSED_MAX_TOKENS
+):
     """
     Build context optimally using available token budget
-    Prioritizes chunks by retrieval order (assuming they're ranked by relevance)
+    Prioritizes articles by retrieval order of their best chunk (assuming
+    chunks are ranked by relevance). Chunks of the same article are merged
+    into one source, with the text shared by adjacent chunks kept once, so
+    "[Source i]" matches the i-th entry of cite_articles(chunks).
+    Given the question embedding and the embedding function, the articles are
+    first compressed to the sentences most similar to the question.
     """
     context_parts = []
     total_tokens = 0
     
-    for i, chunk in enumerate(chunks):
-        content = chunk.page_content.strip()
-        
-        # Clean up whitespace
-        content = re.sub(r'\s+', ' ', content)
-        
-        chunk_tokens = estimate_tokens(content)
+    articles = merge_article_chunks(chunks)
+    if question_embedding is not None and embedding_function is not None:
+        articles = compress_articles(articles, question_embedding, embedding_function, compressed_max_tokens)
+    
+    for i, article in enumerate(articles):
+        content = article["text"]
+        chunk_tokens = article["token_count"]
+        header = f"[Source {i+1}: {article['title']}]" if article["title"] else f"[Source {i+1}]"
         
         # Skip very short chunks
         if chunk_tokens < min_chunk_tokens:
@@ -43,25 +61,39 @@ def build_optimized_context(chunks, max_tokens=6000, min_chunk_tokens=25):
             # Try to fit a truncated version if we have significant space left
             remaining_tokens = max_tokens - total_tokens
             if remaining_tokens > 100:  # Only if we have meaningful space
-                remaining_chars = int(remaining_tokens * 3.5)
                 # Truncate at sentence/word boundary
-                truncated = content[:remaining_chars]
+                truncated = truncate_to_tokens(content, remaining_tokens)
                 if '. ' in truncated:
                     truncated = truncated.rsplit('. ', 1)[0] + '.'
                 else:
                     truncated = truncated.rsplit(' ', 1)[0]
                 
-                context_parts.append(f"[Source {i+1}] {truncated}...")
-                total_tokens += estimate_tokens(truncated)
+                context_parts.append(f"{header} {truncated}...")
+                total_tokens += count_tokens(truncated)
             break
         else:
-            context_parts.append(f"[Source {i+1}] {content}")
+            context_parts.append(f"{header} {content}")
             total_tokens += chunk_tokens
     
     final_context = "\n\n".join(context_parts)
     print(f"Built context: {len(final_context)} characters (~{total_tokens:.0f} tokens) from {len(context_parts)} sources")
     return final_context
 
+def cite_articles(chunks):
+    """One (source, article_id) per article, in the order build_optimized_context numbers them"""
+    sources = []
+    article_ids = []
+    seen = set()
+    for chunk in chunks:
+        article_id = chunk.metadata.get("article_id")
+        key = article_id if article_id is not None else id(chunk)
+        if key in seen:
+            continue
+        seen.add(key)
+        sources.append(chunk.metadata.get("url") or chunk.metadata.get("title", "Unknown"))
+        article_ids.append(article_id)
+    return sources, article_ids
+
 def build_optimized_web_context(web_snippets, max_tokens=6000):
     """Build optimized context from web search results"""
     if isinstance(web_snippets, str):
@@ -77,13 +109,12 @@ def build_optimized_web_context(web_snippets, max_tokens=6000):
         content = snippet.strip()
         content = re.sub(r'\s+', ' ', content)
         
-        snippet_tokens = estimate_tokens(content)
+        snippet_tokens = count_tokens(content)
         
         if total_tokens + snippet_tokens > max_tokens:
             remaining_tokens = max_tokens - total_tokens
             if remaining_tokens > 100:
-                remaining_chars = int(remaining_tokens * 3.5)
-                truncated = content[:remaining_chars].rsplit(' ', 1)[0]
+                truncated = truncate_to_tokens(content, remaining_tokens).rsplit(' ', 1)[0]
                 context_parts.append(f"[Web Source {i+1}] {truncated}...")
             break
         else:
@@ -96,7 +127,7 @@ def build_optimized_web_context(web_snippets, max_tokens=6000):
 
 def calculate_optimal_max_tokens(prompt):
     """Calculate optimal max_tokens based on prompt length"""
-    prompt_tokens = estimate_tokens(prompt)
+    prompt_tokens = count_tokens(prompt)
     
     # Total capacity: 8192 tokens
     # Reserve some safety margin
@@ -111,57 +142,157 @@ def calculate_optimal_max_tokens(prompt):
     print(f"Prompt tokens: ~{prompt_tokens:.0f}, Allocated for response: {max_tokens}")
     return int(max_tokens)
 
-def answer_question(question, vector_store):
-    start_time = time.time()
+def is_cacheable_answer(answer):
+    """Errors from generate_llm_answer come back as answer text; never cache them"""
+    return bool(answer) and not answer.startswith("Error generating answer")
 
-    if not question:
-        print("Please provide a question using --question argument.")
-        return
-    
-    # first retrieve relevant chunks
-    if not vector_store:
-        print("Failed to initialize vector store.")
-        return
-    
-    chunks, scores = retrieve_chunks(vector_store, question)
-    sources = []
-    if not chunks:
-        print("No relevant chunks found.")
-        return
-    print(f"Retrieved {len(chunks)} chunks with scores: {scores}")
-    # for chunk in chunks:
-    #     print(chunk)
+def answer_question(question, vector_store, answer_cache=None):
+    """Blocking wrapper around answer_question_async for scripts. It runs its
+    own event loop, so never call it from async code or alongside the server's
+    loop (the stage limits are bound to one loop)."""
+    return asyncio.run(answer_question_async(question, vector_store, answer_cache=answer_cache))
 
-    # then build optimized prompt
-    if should_fallback_to_web(scores):
+async def answer_from_chunks(question, question_embedding, chunks, scores, vector_store, answer_cache=None, web_task=None, start_time=None):
+    """Second half of the async pipeline: choose local or web context for the
+    retrieved chunks, generate with the routed model and cache the answer.
+    web_task is a speculative web search to reuse (or cancel)."""
+    start_time = start_time or time.time()
+    cited_article_ids = []
+    fallback = should_fallback_to_web(scores)
+    web_result = await resolve_web_search(question, web_task, fallback)
+    if fallback:
         print("Not enough relevant context found in local archive. Using web fallback...")
-        web_snippets, urls = run_web_search(question) # 3 snippets
+        web_snippets, urls = web_result
         sources = urls if urls else ["Web Search"]
-        
-        # Build optimized web context
         optimized_context = build_optimized_web_context(web_snippets, max_tokens=6000)
         prompt = build_web_prompt(question, optimized_context)
     else:
-        sources = [chunk.metadata.get("url") if chunk.metadata.get("url") 
-                            else chunk.metadata.get("title", "Unknown") for chunk in chunks[:5]]
-        
-        # Build optimized local context
-        optimized_context = build_optimized_context(chunks[:5], max_tokens=6000)
+        sources, cited_article_ids = cite_articles(chunks)
+        optimized_context = await EMBED_STAGE.run_sync(
+            build_optimized_context, chunks, max_tokens=6000,
+            question_embedding=question_embedding, embedding_function=vector_store.embeddings
+        )
         prompt = build_local_prompt(question, optimized_context)
-    
-    # Calculate optimal response token allocation
-    optimal_max_tokens = calculate_optimal_max_tokens(prompt)
 
-    # then use LLM to answer the question with optimized parameters
-    answer = generate_llm_answer(prompt, max_tokens=optimal_max_tokens)
-    elapsed_time = time.time() - start_time
-    return {
+    optimal_max_tokens = calculate_optimal_max_tokens(prompt)
+    route = model_router.choose(question, scores, count_tokens(optimized_context), web=fallback)
+    answer, route = await LLM_STAGE.run_async(
+        model_router.generate_async(prompt, route, max_tokens=optimal_max_tokens)
+    )
+    result = {
         "answer": answer,
         "sources": sources,
-        "time_taken_seconds": elapsed_time
+        "model": route.model,
+        "time_taken_seconds": time.time() - start_time
     }
+    if answer_cache is not None and is_cacheable_answer(answer):
+        answer_cache.store(question, question_embedding, result, cited_article_ids)
+    return result
+
+async def answer_question_async(question, vector_store, answer_cache=None, speculative=True):
+    """Answer a question on the event loop: embedding and vector search run in
+    worker threads, web search and the LLM call use async clients, and every
+    stage has its own concurrency limit and timeout (StageTimeoutError).
+    With speculative=True, questions the speculation policy flags start their
+    web search alongside local retrieval once the answer cache misses; it is
+    cancelled if the archive suffices.
+    """
+    start_time = time.time()
+
+    if not question:
+        print("Please provide a question.")
+        return
+
+    if not vector_store:
+        print("Failed to initialize vector store.")
+        return
 
-async def answer_question_stream(question, vector_store):
+    question_embedding = await EMBED_STAGE.run_sync(vector_store.embeddings.embed_query, question)
+    if answer_cache is not None:
+        cached = answer_cache.lookup(question_embedding)
+        if cached:
+            return {**cached, "cached": True, "time_taken_seconds": time.time() - start_time}
+
+    # Speculate only on a cache miss, so cached questions never spend a web search
+    web_task = start_speculative_search(question) if speculative else None
+    try:
+        chunks, scores = await VECTOR_STAGE.run_sync(
+            retrieve_chunks, vector_store, question, query_embedding=question_embedding
+        )
+        if not chunks:
+            print("No relevant chunks found.")
+            return
+        print(f"Retrieved {len(chunks)} chunks with scores: {scores}")
+
+        return await answer_from_chunks(
+            question, question_embedding, chunks, scores, vector_store,
+            answer_cache=answer_cache, web_task=web_task, start_time=start_time
+        )
+    finally:
+        cancel_speculative_search(web_task)
+
+# Questions of one batch generating at the same time (on top of LLM_STAGE's global limit)
+BATCH_LLM_CONCURRENCY = 4
+
+async def answer_questions_batch(questions, vector_store, answer_cache=None, max_concurrency=BATCH_LLM_CONCURRENCY):
+    """
+    Answer many questions with shared retrieval, yielding each result as soon
+    as it is ready (tagged with its index in questions):
+    - all questions are embedded in one model call
+    - cached answers are returned first
+    - the rest are retrieved together (retrieve_chunks_batch: one multi-query
+      vector search per window, chunks shared across questions)
+    - answers are generated with at most max_concurrency LLM calls in flight
+    """
+    start_time = time.time()
+    embeddings = await EMBED_STAGE.run_sync(vector_store.embeddings.embed_documents, list(questions))
+
+    pending = []
+    for index, (question, question_embedding) in enumerate(zip(questions, embeddings)):
+        cached = answer_cache.lookup(question_embedding) if answer_cache is not None else None
+        if cached:
+            yield {**cached, "index": index, "question": question, "cached": True,
+                   "time_taken_seconds": time.time() - start_time}
+        else:
+            pending.append(index)
+    if not pending:
+        return
+
+    retrieved = await VECTOR_STAGE.run_sync(
+        retrieve_chunks_batch, vector_store,
+        [questions[i] for i in pending], [embeddings[i] for i in pending]
+    )
+    print(f"Batch retrieval for {len(pending)} questions in {time.time() - start_time:.2f}s")
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def answer_one(index, chunks, scores):
+        question = questions[index]
+        try:
+            if not chunks:
+                return {"index": index, "question": question, "error": "No relevant information found."}
+            async with semaphore:
+                result = await answer_from_chunks(
+                    question, embeddings[index], chunks, scores, vector_store,
+                    answer_cache=answer_cache, start_time=start_time
+                )
+            return {**result, "index": index, "question": question}
+        except Exception as e:
+            return {"index": index, "question": question, "error": str(e)}
+
+    tasks = [
+        asyncio.create_task(answer_one(index, chunks, scores))
+        for index, (chunks, scores) in zip(pending, retrieved)
+    ]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        # The client went away: stop generating the remaining answers
+        for task in tasks:
+            task.cancel()
+
+async def answer_question_stream(question, vector_store, answer_cache=None, speculative=True):
     """Stream the answer generation process with selective live updates"""
     start_time = time.time()
     
@@ -172,6 +303,7 @@ async def answer_question_stream(question, vector_store):
         }
         return
 
+    web_task = None
     try:
         if not vector_store:
             yield {
@@ -180,6 +312,20 @@ async def answer_question_stream(question, vector_store):
             }
             return
 
+        question_embedding = await EMBED_STAGE.run_sync(vector_store.embeddings.embed_query, question)
+        if answer_cache is not None:
+            cached = answer_cache.lookup(question_embedding)
+            if cached:
+                yield {
+                    'type': 'complete',
+                    'message': 'Answer generated successfully!',
+                    'data': {**cached, 'cached': True, 'time_taken_seconds': time.time() - start_time}
+                }
+                return
+
+        # Speculate only on a cache miss, so cached questions never spend a web search
+        web_task = start_speculative_search(question) if speculative else None
+
         # Step 1: Search local knowledge base (show feedback - takes time)
         yield {
             'type': 'status',
@@ -187,7 +333,9 @@ async def answer_question_stream(question, vector_store):
             'step': 'local_search'
         }
         
-        chunks, scores = retrieve_chunks(vector_store, question)
+        chunks, scores = await VECTOR_STAGE.run_sync(
+            retrieve_chunks, vector_store, question, query_embedding=question_embedding
+        )
         if not chunks:
             yield {
                 'type': 'error',
@@ -197,8 +345,10 @@ async def answer_question_stream(question, vector_store):
 
         # Step 2: Determine search strategy and build optimized context
         sources = []
+        cited_article_ids = []
+        fallback = should_fallback_to_web(scores)
         
-        if should_fallback_to_web(scores):
+        if fallback:
             # Web search fallback (show feedback - takes significant time)
             yield {
                 'type': 'status',
@@ -207,7 +357,7 @@ async def answer_question_stream(question, vector_store):
             }
             
             try:
-                web_snippets, urls = run_web_search(question)
+                web_snippets, urls = await resolve_web_search(question, web_task, fallback)
                 sources = urls if urls else ["Web Search"]
                 
                 # Build optimized web context
@@ -223,17 +373,20 @@ async def answer_question_stream(question, vector_store):
                 return
         else:
             # Use local context (fast, no need for detailed feedback)
+            await resolve_web_search(question, web_task, fallback)
             yield {
                 'type': 'status',
                 'message': 'Building optimized context...',
                 'step': 'build_context'
             }
             
-            sources = [chunk.metadata.get("url") if chunk.metadata.get("url") 
-                      else chunk.metadata.get("title", "Unknown") for chunk in chunks]
+            sources, cited_article_ids = cite_articles(chunks)
             print(sources)
             # Build optimized local context
-            optimized_context = build_optimized_context(chunks, max_tokens=6000)
+            optimized_context = await EMBED_STAGE.run_sync(
+                build_optimized_context, chunks, max_tokens=6000,
+                question_embedding=question_embedding, embedding_function=vector_store.embeddings
+            )
             prompt = build_local_prompt(question, optimized_context)
             search_method = 'local_knowledge'
 
@@ -247,7 +400,20 @@ async def answer_question_stream(question, vector_store):
         try:
             # Calculate optimal response token allocation
             optimal_max_tokens = calculate_optimal_max_tokens(prompt)
-            answer = generate_llm_answer(prompt, max_tokens=optimal_max_tokens)
+            route = model_router.choose(question, scores, count_tokens(optimized_context), web=fallback)
+            
+            # Forward tokens as they arrive so the client can render the answer progressively
+            # The whole stream is bounded by the LLM stage timeout, not only the wait for a slot
+            answer_parts = []
+            async for delta, route in LLM_STAGE.stream(
+                model_router.stream(prompt, route, max_tokens=optimal_max_tokens)
+            ):
+                answer_parts.append(delta)
+                yield {
+                    'type': 'token',
+                    'content': delta
+                }
+            answer = "".join(answer_parts).strip()
                 
         except Exception as e:
             yield {
@@ -258,15 +424,19 @@ async def answer_question_stream(question, vector_store):
 
         # Final response - send complete answer
         elapsed_time = time.time() - start_time
+        result = {
+            'answer': answer,
+            'sources': sources,
+            'time_taken_seconds': elapsed_time,
+            'method': search_method,
+            'model': route.model
+        }
+        if answer_cache is not None and is_cacheable_answer(answer):
+            answer_cache.store(question, question_embedding, result, cited_article_ids)
         yield {
             'type': 'complete',
             'message': 'Answer generated successfully!',
-            'data': {
-                'answer': answer,
-                'sources': sources,
-                'time_taken_seconds': elapsed_time,
-                'method': search_method
-            }
+            'data': result
         }
 
     except Exception as e:
@@ -274,6 +444,8 @@ async def answer_question_stream(question, vector_store):
             'type': 'error',
             'message': f'Unexpected error: {str(e)}'
         }
+    finally:
+        cancel_speculative_search(web_task)
 
 # Legacy function for backward compatibility
 def answer_question_stream_legacy(question):
@@ -1,17 +1,21 @@
-from groq import Groq
+from groq import Groq, AsyncGroq
 from dotenv import load_dotenv
 import os
 load_dotenv() 
 
 api_key = os.getenv("GROQ_API_KEY")
 client = Groq(api_key=api_key)
+async_client = AsyncGroq(api_key=api_key)
+
+SYSTEM_PROMPT = "You are a helpful news assistant."
+
 def generate_llm_answer(prompt, model="llama-3.3-70b-versatile", max_tokens=2000):
     try:
         print(f"Generating answer with model {model}...")
         response = client.chat.completions.create(
             model=model,
             messages=[
-                {"role": "system", "content": "You are a helpful news assistant."},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             max_tokens=max_tokens,
@@ -20,4 +24,49 @@ def generate_llm_answer(prompt, model="llama-3.3-70b-versatile", max_tokens=2000
         )
         return response.choices[0].message.content.strip()
     except Exception as e:
-        return f"Error generating answer: {e}"
\ No newline at end of file
+        return f"Error generating answer: {e}"
+
+async def complete_llm_answer(prompt, model="llama-3.3-70b-versatile", max_tokens=2000):
+    """Async completion that raises on failure (for callers that retry elsewhere)"""
+    print(f"Generating answer with model {model}...")
+    response = await async_client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=max_tokens,
+        temperature=0.5,
+        top_p=0.95
+    )
+    return response.choices[0].message.content.strip()
+
+async def generate_llm_answer_async(prompt, model="llama-3.3-70b-versatile", max_tokens=2000):
+    """Async generate_llm_answer; the event loop keeps serving other requests meanwhile"""
+    try:
+        return await complete_llm_answer(prompt, model=model, max_tokens=max_tokens)
+    except Exception as e:
+        return f"Error generating answer: {e}"
+
+async def stream_llm_answer(prompt, model="llama-3.3-70b-versatile", max_tokens=2000):
+    """Yield answer text deltas as Groq produces them (async, does not block the event loop).
+    Errors are raised to the caller, which has already sent partial output.
+    """
+    print(f"Streaming answer with model {model}...")
+    stream = await async_client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=max_tokens,
+        temperature=0.5,
+        top_p=0.95,
+        stream=True
+    )
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
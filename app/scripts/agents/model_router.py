@@ -0,0 +1,167 @@
+import asyncio
+import re
+import threading
+import time
+from collections import deque
+
+from app.scripts.agents.llm_client import complete_llm_answer, generate_llm_answer, stream_llm_answer
+from app.scripts.utils.should_fallback_to_web import local_answer_probability
+
+FAST_MODEL = "llama-3.1-8b-instant"
+STRONG_MODEL = "llama-3.3-70b-versatile"
+
+# Questions asking for reasoning rather than a lookup
+ANALYTICAL_PATTERN = re.compile(
+    r"\b(why|how (?:does|do|did|will|would|could|might)|explain|analy[sz]e|analysis|compare|"
+    r"comparison|versus|vs|difference|impact|implications?|consequences?|predict|outlook|"
+    r"pros and cons|trade-?offs?|should)\b"
+)
+
+class ModelRoute:
+    """A model with its latency SLO (seconds to a full answer, or to the first streamed token)"""
+    def __init__(self, name, model, slo_seconds, first_token_slo_seconds):
+        self.name = name
+        self.model = model
+        self.slo_seconds = slo_seconds
+        self.first_token_slo_seconds = first_token_slo_seconds
+        self.latencies = deque(maxlen=200)
+        self.requests = 0
+        self.failures = 0
+
+    def p50(self):
+        ordered = sorted(self.latencies)
+        return ordered[len(ordered) // 2] if ordered else None
+
+    def get_stats(self):
+        p50 = self.p50()
+        return {
+            "model": self.model,
+            "slo_seconds": self.slo_seconds,
+            "requests": self.requests,
+            "failures": self.failures,
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+        }
+
+class ModelRouter:
+    """
+    Sends each question to the fast or the strong model.
+    Cheap features decide: analytical wording, question length, retrieval
+    confidence (the web fallback model), context size and web fallback
+    all point to the strong model; plain lookups over confident local context
+    go to the fast one. A call that fails or misses its route's SLO is retried
+    once on the other model. While the strong model runs above its SLO
+    (provider congestion), borderline questions are kept on the fast model.
+    """
+
+    def __init__(
+        self,
+        fast=None,
+        strong=None,
+        max_fast_question_words=18,
+        min_fast_confidence=0.75,
+        max_fast_context_tokens=2500
+    ):
+        self.fast = fast or ModelRoute("fast", FAST_MODEL, slo_seconds=8, first_token_slo_seconds=2)
+        self.strong = strong or ModelRoute("strong", STRONG_MODEL, slo_seconds=30, first_token_slo_seconds=6)
+        self.max_fast_question_words = max_fast_question_words
+        self.min_fast_confidence = min_fast_confidence
+        self.max_fast_context_tokens = max_fast_context_tokens
+        self._lock = threading.Lock()
+
+    def other(self, route):
+        return self.strong if route is self.fast else self.fast
+
+    def choose(self, question, scores=None, context_tokens=0, web=False):
+        """Route for a question given its retrieval scores and context size"""
+        if ANALYTICAL_PATTERN.search(question.lower()):
+            return self.strong
+
+        reasons = 0
+        if len(question.split()) > self.max_fast_question_words:
+            reasons += 1
+        if web or not scores or local_answer_probability(scores) < self.min_fast_confidence:
+            reasons += 1
+        if context_tokens > self.max_fast_context_tokens:
+            reasons += 1
+
+        if reasons == 0:
+            return self.fast
+        strong_p50 = self.strong.p50()
+        if reasons == 1 and strong_p50 is not None and strong_p50 > self.strong.slo_seconds:
+            return self.fast
+        return self.strong
+
+    def _record(self, route, started, ok):
+        with self._lock:
+            route.requests += 1
+            if ok:
+                route.latencies.append(time.perf_counter() - started)
+            else:
+                route.failures += 1
+
+    def generate(self, prompt, route, max_tokens=2000):
+        """Blocking answer (text, route used); falls back to the other model on error"""
+        answer = ""
+        for candidate in (route, self.other(route)):
+            started = time.perf_counter()
+            answer = generate_llm_answer(prompt, model=candidate.model, max_tokens=max_tokens)
+            ok = not answer.startswith("Error generating answer")
+            self._record(candidate, started, ok)
+            if ok:
+                return answer, candidate
+        return answer, candidate
+
+    async def generate_async(self, prompt, route, max_tokens=2000):
+        """Answer (text, route used); on error or a missed SLO the other model is tried"""
+        error = None
+        for candidate in (route, self.other(route)):
+            started = time.perf_counter()
+            try:
+                answer = await asyncio.wait_for(
+                    complete_llm_answer(prompt, model=candidate.model, max_tokens=max_tokens),
+                    timeout=candidate.slo_seconds
+                )
+            except Exception as e:
+                self._record(candidate, started, False)
+                print(f"Model {candidate.model} failed ({str(e) or type(e).__name__}), trying fallback")
+                error = e
+                continue
+            self._record(candidate, started, True)
+            return answer, candidate
+        return f"Error generating answer: {error}", candidate
+
+    async def stream(self, prompt, route, max_tokens=2000):
+        """Yield (delta, route) pairs. The fallback model takes over only while
+        nothing has been sent yet: on an error or when the first token misses
+        the route's first-token SLO."""
+        candidates = (route, self.other(route))
+        for attempt, candidate in enumerate(candidates):
+            started = time.perf_counter()
+            deltas = stream_llm_answer(prompt, model=candidate.model, max_tokens=max_tokens)
+            try:
+                first = await asyncio.wait_for(deltas.__anext__(), timeout=candidate.first_token_slo_seconds)
+            except StopAsyncIteration:
+                self._record(candidate, started, True)
+                return
+            except Exception as e:
+                await deltas.aclose()
+                self._record(candidate, started, False)
+                if attempt == len(candidates) - 1:
+                    raise
+                print(f"Model {candidate.model} failed before its first token ({str(e) or type(e).__name__}), trying fallback")
+                continue
+
+            yield first, candidate
+            try:
+                async for delta in deltas:
+                    yield delta, candidate
+            except Exception:
+                self._record(candidate, started, False)
+                raise
+            self._record(candidate, started, True)
+            return
+
+    def get_stats(self):
+        return {route.name: route.get_stats() for route in (self.fast, self.strong)}
+
+model_router = ModelRouter()
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import weakref
+from collections import deque
+
+from app.infra.concurrency import WEB_SEARCH_STAGE
+from app.scripts.agents.web_search_agent import run_web_search_async
+from app.scripts.utils.is_time_sensitive import is_time_sensitive
+
+class SpeculationPolicy:
+    """Decides when to start the web search before local retrieval has scored.
+    Time-sensitive questions always speculate; other questions speculate only
+    while the recent fallback rate is high (e.g. the archive is stale after
+    an outage), so normal traffic does not pay for wasted Tavily calls.
+    """
+
+    def __init__(self, window: int = 50, fallback_rate_threshold: float = 0.5):
+        self.fallback_rate_threshold = fallback_rate_threshold
+        self._recent_fallbacks = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.started = 0
+        self.used = 0
+        self.cancelled = 0
+
+    def fallback_rate(self) -> float:
+        with self._lock:
+            if not self._recent_fallbacks:
+                return 0.0
+            return sum(self._recent_fallbacks) / len(self._recent_fallbacks)
+
+    def should_speculate(self, question: str) -> bool:
+        return is_time_sensitive(question) or self.fallback_rate() >= self.fallback_rate_threshold
+
+    def record(self, fallback: bool):
+        """Record whether a question ended up needing the web fallback"""
+        with self._lock:
+            self._recent_fallbacks.append(fallback)
+
+    def get_stats(self) -> dict:
+        return {
+            "started": self.started,
+            "used": self.used,
+            "cancelled": self.cancelled,
+            "fallback_rate": round(self.fallback_rate(), 3),
+        }
+
+speculation_policy = SpeculationPolicy()
+_cancelled_tasks = weakref.WeakSet()
+
+def _discard_result(task):
+    # Retrieve the exception of an unused search so asyncio does not log it
+    if not task.cancelled():
+        task.exception()
+
+async def _web_search(question):
+    return await WEB_SEARCH_STAGE.run_async(run_web_search_async(question))
+
+def start_speculative_search(question, policy=speculation_policy):
+    """Start the web search in the background when the policy allows it; the task or None"""
+    if not policy.should_speculate(question):
+        return None
+    policy.started += 1
+    print(f"Speculative web search started for: {question}")
+    return asyncio.create_task(_web_search(question))
+
+async def resolve_web_search(question, task, fallback, policy=speculation_policy):
+    """(snippets, urls) when the local scores called for the web, else None.
+    Reuses the speculative task when there is one and cancels it when unused."""
+    policy.record(fallback)
+    if not fallback:
+        cancel_speculative_search(task, policy)
+        return None
+
+    if task is not None:
+        policy.used += 1
+        return await task
+    return await _web_search(question)
+
+def cancel_speculative_search(task, policy=speculation_policy):
+    """Cancel an unfinished speculative search that is no longer needed; idempotent"""
+    if task is None or task in _cancelled_tasks:
+        return
+    _cancelled_tasks.add(task)
+    task.add_done_callback(_discard_result)
+    if not task.done():
+        policy.cancelled += 1
+        task.cancel()
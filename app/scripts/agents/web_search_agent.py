@@ -1,21 +1,60 @@
+import asyncio
 import os
 from dotenv import load_dotenv
 from langchain_community.tools.tavily_search import TavilySearchResults
+from app.core.settings import WEB_SEARCH_CACHE_PATH
+from app.infra.concurrency import WEB_SEARCH_STAGE, StageTimeoutError
+from app.scripts.agents.web_search_cache import WebSearchCache
 
 load_dotenv()  # This loads the .env file from project root
 api_key = os.getenv("TAVILY_API_KEY")
 search_tool = TavilySearchResults()
+web_search_cache = WebSearchCache(persist_path=WEB_SEARCH_CACHE_PATH)
+_background_refreshes = set()  # keeps refresh tasks referenced until they finish
 
-def run_web_search(query, num_snippets=3):
+def format_search_results(results, num_snippets=3):
+    """(snippets text, urls) from a Tavily response"""
+    if isinstance(results, list):
+        snippets = [doc['content'] for doc in results[:num_snippets]]
+        return "\n\n".join(snippets), [doc['url'] for doc in results[:num_snippets]]
+    else:
+        #print("Unexpected result format:", results)
+        return results.strip(), ["Web Search"]
+
+async def _search_async(query, num_snippets=3):
     try:
-        results = search_tool.run(query)
-       # print(f"Web search results: {results}")
-        if isinstance(results, list):
-            snippets = [doc['content'] for doc in results[:num_snippets]]
-            return "\n\n".join(snippets), [doc['url'] for doc in results[:num_snippets]]
-        else:
-            #print("Unexpected result format:", results)
-            return results.strip(), ["Web Search"]
+        results = await search_tool.arun(query)
+        return format_search_results(results, num_snippets), True
 
     except Exception as e:
-        return f"Web search error: {e}"
+        return (f"Web search error: {e}", []), False
+
+async def _refresh_async(query, num_snippets):
+    # Background refreshes share the web search stage's limit and timeout with live searches
+    ok = False
+    try:
+        result, ok = await WEB_SEARCH_STAGE.run_async(_search_async(query, num_snippets))
+    except StageTimeoutError:
+        pass
+    finally:
+        if ok:
+            web_search_cache.put(query, result, num_snippets)
+        else:
+            # Also on cancellation, so the next stale hit retries
+            web_search_cache.revalidation_failed(query, num_snippets)
+
+async def run_web_search_async(query, num_snippets=3):
+    """(snippets, urls) for query, cached per query and snippet count.
+    A stale hot entry is returned at once and refreshed in the background."""
+    cached, revalidate = web_search_cache.get(query, num_snippets)
+    if cached is not None:
+        if revalidate:
+            task = asyncio.create_task(_refresh_async(query, num_snippets))
+            _background_refreshes.add(task)
+            task.add_done_callback(_background_refreshes.discard)
+        return cached
+
+    result, ok = await _search_async(query, num_snippets)
+    if ok:
+        web_search_cache.put(query, result, num_snippets)
+    return result
@@ -0,0 +1,156 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+from app.scripts.utils.normalize_query import normalize_query
+
+class WebSearchCache:
+    """Bounded LRU cache of web search results keyed by normalized query and
+    snippet count (results are stored already formatted for that count).
+
+    Entries are fresh for ttl_seconds. A hot entry (hit at least hot_hits
+    times) stays servable for another stale_seconds: callers get the stale
+    result immediately and refresh it in the background (stale-while-revalidate).
+    With persist_path the cache is loaded on startup; stores mark it dirty and
+    a timer thread writes it at most every flush_seconds, so a put never does
+    file I/O on the caller's thread. Call flush() on shutdown.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 600,
+        stale_seconds: int = 1800,
+        max_entries: int = 256,
+        hot_hits: int = 2,
+        persist_path: Optional[Path] = None,
+        flush_seconds: float = 5.0
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.hot_hits = hot_hits
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.flush_seconds = flush_seconds
+
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._flush_timer = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._load()
+
+    @staticmethod
+    def _key(query: str, num_snippets: int) -> str:
+        return f"{num_snippets}|{normalize_query(query)}"
+
+    def get(self, query: str, num_snippets: int = 3) -> Tuple[Optional[tuple], bool]:
+        """(cached result or None, whether the caller should revalidate it)"""
+        key = self._key(query, num_snippets)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+
+            age = time.time() - entry["stored_at"]
+            if age < self.ttl_seconds:
+                entry["hits"] += 1
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["result"], False
+
+            if entry["hits"] >= self.hot_hits and age < self.ttl_seconds + self.stale_seconds:
+                entry["hits"] += 1
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                revalidate = key not in self._refreshing
+                self._refreshing.add(key)
+                return entry["result"], revalidate
+
+            del self._entries[key]
+            self.misses += 1
+            return None, False
+
+    def put(self, query: str, result: tuple, num_snippets: int = 3):
+        key = self._key(query, num_snippets)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            self._entries[key] = {
+                "result": result,
+                "stored_at": time.time(),
+                # A refreshed hot entry stays hot
+                "hits": previous["hits"] if previous else 0,
+            }
+            self._refreshing.discard(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self.persist_path:
+                self._dirty = True
+                if self._flush_timer is None:
+                    self._flush_timer = threading.Timer(self.flush_seconds, self.flush)
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+
+    def revalidation_failed(self, query: str, num_snippets: int = 3):
+        """Let the next stale hit retry the refresh"""
+        with self._lock:
+            self._refreshing.discard(self._key(query, num_snippets))
+
+    def _load(self):
+        if not self.persist_path or not self.persist_path.exists():
+            return
+        try:
+            data = json.loads(self.persist_path.read_text())
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not load web search cache: {e}")
+            return
+        # Stored oldest first, so LRU order survives the round trip
+        for key, entry in data.items():
+            snippets, urls = entry["result"]
+            self._entries[key] = {**entry, "result": (snippets, urls)}
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def flush(self):
+        """Write pending changes to persist_path now"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            # Entry dicts are copied since get() keeps updating their hit counts
+            snapshot = {key: dict(entry) for key, entry in self._entries.items()}
+        self._save(snapshot)
+
+    def _save(self, snapshot: dict):
+        try:
+            with self._save_lock:
+                tmp_path = self.persist_path.with_suffix(".tmp")
+                tmp_path.write_text(json.dumps(snapshot))
+                tmp_path.replace(self.persist_path)
+        except OSError as e:
+            logging.warning(f"Could not persist web search cache: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._refreshing.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,46 @@
+# Fit the web fallback model (should_fallback_to_web) on labelled questions
+# Input is JSON lines, one question each: {"scores": [retrieved cosine distances],
+# "label": 1 if the local answer was good, 0 if the web was needed}.
+# The fitted coefficients are written as JSON for FALLBACK_MODEL_PATH.
+# Usage:
+#   python -m app.scripts.benchmarks.fit_fallback_model labelled.jsonl --out fallback_model.json
+import argparse
+import json
+
+from app.scripts.utils.should_fallback_to_web import (
+    DEFAULT_FALLBACK_MODEL, fit_fallback_model, local_answer_probability
+)
+
+def accuracy(model, score_lists, labels):
+    predictions = [local_answer_probability(scores, model) >= 0.5 for scores in score_lists]
+    return sum(prediction == bool(label) for prediction, label in zip(predictions, labels)) / len(labels)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the web fallback model on labelled questions")
+    parser.add_argument("labelled", help="JSON lines of {scores, label}")
+    parser.add_argument("--out", default="fallback_model.json", help="Where to write the fitted model")
+    parser.add_argument("--epochs", type=int, default=2000)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    args = parser.parse_args()
+
+    score_lists, labels = [], []
+    with open(args.labelled) as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                if row["scores"]:
+                    score_lists.append(row["scores"])
+                    labels.append(int(row["label"]))
+    if len(set(labels)) < 2:
+        raise SystemExit("Need labelled questions of both classes to fit the model")
+
+    model = fit_fallback_model(score_lists, labels, epochs=args.epochs, learning_rate=args.learning_rate)
+    print(f"Fitted on {len(labels)} questions: {model}")
+    print(f"Training accuracy: fitted {accuracy(model, score_lists, labels):.3f}, "
+          f"defaults {accuracy(DEFAULT_FALLBACK_MODEL, score_lists, labels):.3f}")
+    with open(args.out, "w") as f:
+        json.dump(model, f, indent=2)
+    print(f"Wrote {args.out}; set FALLBACK_MODEL_PATH to use it")
+
+if __name__ == "__main__":
+    main()
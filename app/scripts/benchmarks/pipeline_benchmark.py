@@ -0,0 +1,240 @@
+# Offline end-to-end benchmark of the RAG pipeline
+# Groq, Tavily and the embedding model are replaced by local stand-ins
+# (app/scripts/benchmarks/stand_ins.py) and retrieval runs on a seeded SQLite
+# corpus loaded into an in-memory vector store, so no keys or network are needed.
+# Usage:
+#   python -m app.scripts.benchmarks.pipeline_benchmark --articles 200 --questions 40 --concurrency 8
+#   python -m app.scripts.benchmarks.pipeline_benchmark --scenarios ask stream --llm-rpm 30 --json report.json
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# The real clients are built at import time and refuse to start without keys
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "offline-benchmark")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.databases.models import Base, NewsArticle
+from app.infra.concurrency import PIPELINE_STAGES
+from app.scripts.agents import llm_client, web_search_agent
+from app.scripts.benchmarks.stand_ins import (
+    FakeAsyncGroq, FakeGroq, FakeTavily, HashEmbeddings, InMemoryVectorStore, seed_corpus
+)
+from app.scripts.Main.answer import (
+    answer_question_async, answer_question_stream, answer_questions_batch
+)
+from app.scripts.retrieval.bm25_index import BM25Index
+from app.services.ai_services import AIService
+
+SCENARIOS = ("ask", "stream", "batch", "ingest")
+
+def percentiles(values):
+    """p50/p90/p99/mean/max in milliseconds"""
+    if not values:
+        return None
+    data = np.asarray(values, dtype=np.float64)
+    return {
+        "count": len(values),
+        "p50_ms": round(float(np.percentile(data, 50)), 2),
+        "p90_ms": round(float(np.percentile(data, 90)), 2),
+        "p99_ms": round(float(np.percentile(data, 99)), 2),
+        "mean_ms": round(float(data.mean()), 2),
+        "max_ms": round(float(data.max()), 2),
+    }
+
+def make_questions(num_questions, num_articles, local_share, seed):
+    """Questions about seeded entities (answerable locally) mixed with unknown
+    ones (web fallback); some unknown ones are worded as time-sensitive"""
+    rng = random.Random(seed)
+    questions = []
+    for n in range(num_questions):
+        if rng.random() < local_share:
+            questions.append(f"What happened with Entity{rng.randrange(num_articles)}?")
+        elif n % 2:
+            questions.append(f"What is the latest on Unknown{n} today?")
+        else:
+            questions.append(f"Who is behind Unknown{n}?")
+    return questions
+
+def reset_stage_stats():
+    for stage in PIPELINE_STAGES:
+        stage.latencies_ms.clear()
+
+def stage_report():
+    return {stage.name: percentiles(list(stage.latencies_ms)) for stage in PIPELINE_STAGES}
+
+async def run_requests(calls, concurrency):
+    """Run coroutine factories with bounded concurrency; (latencies ms, errors, wall seconds)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = []
+
+    async def one(call):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await call()
+                if isinstance(result, dict) and str(result.get("answer", "")).startswith("Error"):
+                    errors.append(result["answer"])
+            except Exception as e:
+                errors.append(str(e))
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(call) for call in calls))
+    return latencies, errors, time.perf_counter() - started
+
+def summarize(latencies, errors, wall_seconds, extra=None):
+    report = {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(len(latencies) / wall_seconds, 2) if wall_seconds else None,
+        "latency": percentiles(latencies),
+        "stages": stage_report(),
+    }
+    if errors:
+        report["first_error"] = errors[0]
+    report.update(extra or {})
+    return report
+
+async def bench_ask(questions, store, concurrency):
+    calls = [lambda q=q: answer_question_async(q, store) for q in questions]
+    return summarize(*await run_requests(calls, concurrency))
+
+async def bench_stream(questions, store, concurrency):
+    first_tokens = []
+
+    async def consume(question):
+        started = time.perf_counter()
+        first = None
+        async for update in answer_question_stream(question, store):
+            if update["type"] == "token" and first is None:
+                first = (time.perf_counter() - started) * 1000
+            if update["type"] == "error":
+                raise RuntimeError(update["message"])
+        if first is not None:
+            first_tokens.append(first)
+
+    calls = [lambda q=q: consume(q) for q in questions]
+    return summarize(*await run_requests(calls, concurrency), {"time_to_first_token": percentiles(first_tokens)})
+
+async def bench_batch(questions, store, batch_size):
+    latencies = []
+    errors = []
+    started = time.perf_counter()
+    for start in range(0, len(questions), batch_size):
+        batch_started = time.perf_counter()
+        async for result in answer_questions_batch(questions[start:start + batch_size], store):
+            latencies.append((time.perf_counter() - batch_started) * 1000)
+            if "error" in result:
+                errors.append(result["error"])
+    return summarize(latencies, errors, time.perf_counter() - started, {"batch_size": batch_size})
+
+async def bench_ingest(db, groq, num_articles, rate_limit_delay):
+    service = AIService()
+    service.client = groq
+    service.rate_limit_delay = rate_limit_delay
+    articles = db.query(NewsArticle).limit(num_articles).all()
+    started = time.perf_counter()
+    results = await service.batch_process_articles(articles)
+    wall = time.perf_counter() - started
+    return {
+        "articles": len(results),
+        "wall_seconds": round(wall, 3),
+        "throughput_articles_per_s": round(len(results) / wall, 2) if wall else None,
+    }
+
+async def run(args):
+    db_path = Path(args.db) if args.db else Path(tempfile.mkdtemp()) / "benchmark.db"
+    engine = create_engine(f"sqlite:///{db_path.as_posix()}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    embeddings = HashEmbeddings(latency_per_text=args.embed_latency_ms / 1000)
+    if not db.query(NewsArticle).count():
+        started = time.perf_counter()
+        seed_corpus(db, embeddings, num_articles=args.articles, seed=args.seed)
+        print(f"Seeded {args.articles} articles into {db_path} in {time.perf_counter() - started:.2f}s")
+
+    lexical_index = BM25Index()
+    store = InMemoryVectorStore.from_session(db, embeddings, lexical_index)
+    for chunk in store.chunks:
+        lexical_index.add_chunk(chunk.article_id, chunk.chunk_index, chunk.published_at, chunk.content)
+
+    groq_options = dict(
+        latency_scale=args.llm_latency_scale,
+        answer_tokens=args.answer_tokens,
+        requests_per_minute=args.llm_rpm or None,
+        error_rate=args.llm_error_rate,
+        seed=args.seed,
+    )
+    sync_groq = FakeGroq(**groq_options)
+    async_groq = FakeAsyncGroq(**groq_options)
+    tavily = FakeTavily(latency_seconds=args.web_latency_ms / 1000, seed=args.seed)
+    llm_client.client = sync_groq
+    llm_client.async_client = async_groq
+    web_search_agent.search_tool = tavily
+
+    questions = make_questions(args.questions, args.articles, args.local_share, args.seed)
+    report = {"config": vars(args), "scenarios": {}}
+    for scenario in args.scenarios:
+        reset_stage_stats()
+        web_search_agent.web_search_cache.clear()
+        print(f"Running {scenario}...")
+        if scenario == "ask":
+            result = await bench_ask(questions, store, args.concurrency)
+        elif scenario == "stream":
+            result = await bench_stream(questions, store, args.concurrency)
+        elif scenario == "batch":
+            result = await bench_batch(questions, store, args.batch_size)
+        else:
+            result = await bench_ingest(db, sync_groq, min(args.articles, args.ingest_articles), args.ingest_delay)
+        report["scenarios"][scenario] = result
+
+    report["stand_ins"] = {
+        "groq_requests": sync_groq.requests + async_groq.requests,
+        "groq_rate_limited": sync_groq.rejected + async_groq.rejected,
+        "tavily_requests": tavily.requests,
+        "embedding_calls": embeddings.calls,
+    }
+    db.close()
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end RAG pipeline benchmark")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--articles", type=int, default=200, help="Articles in the seeded corpus")
+    parser.add_argument("--questions", type=int, default=40, help="Questions per scenario")
+    parser.add_argument("--local-share", type=float, default=0.7, help="Share of questions answerable locally")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent requests")
+    parser.add_argument("--batch-size", type=int, default=20, help="Questions per /ask/batch call")
+    parser.add_argument("--answer-tokens", type=int, default=150, help="Tokens per generated answer")
+    parser.add_argument("--llm-latency-scale", type=float, default=1.0, help="Multiplier on model latency profiles")
+    parser.add_argument("--llm-rpm", type=int, default=0, help="Groq requests per minute before 429s (0 = unlimited)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Share of Groq calls that fail")
+    parser.add_argument("--web-latency-ms", type=float, default=800, help="Median Tavily latency")
+    parser.add_argument("--embed-latency-ms", type=float, default=0, help="Simulated embedding cost per text")
+    parser.add_argument("--ingest-articles", type=int, default=20, help="Articles classified in the ingest scenario")
+    parser.add_argument("--ingest-delay", type=float, default=0.0, help="AIService rate_limit_delay for ingest")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--db", help="SQLite file to reuse (seeded on first use)")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2, default=str))
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2, default=str))
+
+if __name__ == "__main__":
+    main()
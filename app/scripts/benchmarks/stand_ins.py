@@ -0,0 +1,296 @@
+# Local stand-ins for the external services used by the RAG pipeline
+# - FakeGroq / FakeAsyncGroq: the chat.completions.create surface of the Groq
+#   SDK, with per-model latency, token streaming, rate limits and errors
+# - FakeTavily: run / arun of TavilySearchResults with configurable latency
+# - HashEmbeddings: deterministic hashed bag-of-words embeddings (no model download)
+# - InMemoryVectorStore: the ChunkVectorStore search interface over a NumPy matrix
+import asyncio
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.databases.models import ArticleChunk, EMBEDDING_DIM, NewsArticle
+from app.databases.vector_store import ChunkVectorStore
+from app.scripts.retrieval.bm25_index import tokenize
+from app.scripts.utils.count_tokens import count_tokens
+
+# (seconds to first token, tokens per second) per model, roughly Groq's public numbers
+MODEL_PROFILES = {
+    "llama-3.1-8b-instant": (0.15, 750.0),
+    "llama-3.3-70b-versatile": (0.40, 275.0),
+}
+DEFAULT_PROFILE = (0.40, 275.0)
+
+class FakeRateLimitError(Exception):
+    """Raised like Groq's 429 when the stand-in's request budget is exhausted"""
+    status_code = 429
+
+class FakeGroqBase:
+    """Shared latency, rate limit and answer generation for the Groq stand-ins"""
+
+    def __init__(
+        self,
+        latency_scale=1.0,
+        answer_tokens=150,
+        requests_per_minute=None,
+        error_rate=0.0,
+        seed=0
+    ):
+        self.latency_scale = latency_scale
+        self.answer_tokens = answer_tokens
+        self.requests_per_minute = requests_per_minute
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._calls = deque()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rejected = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _admit(self):
+        """Apply the rate limit and the injected error rate"""
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            while self._calls and now - self._calls[0] > 60:
+                self._calls.popleft()
+            if self.requests_per_minute and len(self._calls) >= self.requests_per_minute:
+                self.rejected += 1
+                raise FakeRateLimitError("Rate limit reached (stand-in)")
+            self._calls.append(now)
+            if self._random.random() < self.error_rate:
+                raise RuntimeError("Injected upstream error (stand-in)")
+            jitter = self._random.lognormvariate(0, 0.25)
+        return jitter
+
+    def _timings(self, model, jitter):
+        first_token, tokens_per_second = MODEL_PROFILES.get(model, DEFAULT_PROFILE)
+        return first_token * jitter * self.latency_scale, self.latency_scale / tokens_per_second
+
+    def _answer_tokens(self, messages, max_tokens):
+        prompt = messages[-1]["content"]
+        if "TOPIC:" in prompt:
+            # AIService classification prompt
+            text = "TOPIC: Technology\nSUMMARY: " + " ".join(f"summary{i}" for i in range(60))
+            return [f"{word} " for word in text.split(" ")]
+        count = min(self.answer_tokens, max_tokens or self.answer_tokens)
+        return [f"token{i} " for i in range(count)]
+
+    @staticmethod
+    def _response(text):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+    @staticmethod
+    def _chunk(delta):
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+class FakeGroq(FakeGroqBase):
+    """Blocking client: Groq().chat.completions.create(...)"""
+
+    def _create(self, model, messages, max_tokens=None, stream=False, **kwargs):
+        first_token, per_token = self._timings(model, self._admit())
+        tokens = self._answer_tokens(messages, max_tokens)
+        if stream:
+            def chunks():
+                time.sleep(first_token)
+                for token in tokens:
+                    yield self._chunk(token)
+                    time.sleep(per_token)
+            return chunks()
+        time.sleep(first_token + per_token * len(tokens))
+        return self._response("".join(tokens).strip())
+
+class FakeAsyncGroq(FakeGroqBase):
+    """Async client: await AsyncGroq().chat.completions.create(...)"""
+
+    async def _create(self, model, messages, max_tokens=None, stream=False, **kwargs):
+        first_token, per_token = self._timings(model, self._admit())
+        tokens = self._answer_tokens(messages, max_tokens)
+        if stream:
+            async def chunks():
+                await asyncio.sleep(first_token)
+                for token in tokens:
+                    yield self._chunk(token)
+                    await asyncio.sleep(per_token)
+            return chunks()
+        await asyncio.sleep(first_token + per_token * len(tokens))
+        return self._response("".join(tokens).strip())
+
+class FakeTavily:
+    """TavilySearchResults stand-in: run / arun return result dicts after a delay"""
+
+    def __init__(self, latency_seconds=0.8, num_results=5, seed=0):
+        self.latency_seconds = latency_seconds
+        self.num_results = num_results
+        self._random = random.Random(seed)
+        self.requests = 0
+
+    def _results(self, query):
+        self.requests += 1
+        return [
+            {"url": f"https://example.com/{abs(hash(query)) % 10000}/{i}",
+             "content": f"Web result {i} for {query}. " + "Background sentence about the story. " * 8}
+            for i in range(self.num_results)
+        ]
+
+    def _delay(self):
+        return self.latency_seconds * self._random.lognormvariate(0, 0.3)
+
+    def run(self, query):
+        time.sleep(self._delay())
+        return self._results(query)
+
+    async def arun(self, query):
+        await asyncio.sleep(self._delay())
+        return self._results(query)
+
+class HashEmbeddings:
+    """Deterministic embeddings: hashed, signed bag of words, L2-normalized.
+    Texts sharing words land close together, which is all retrieval needs to
+    exercise its code paths. latency_per_text simulates model cost."""
+
+    def __init__(self, dim=EMBEDDING_DIM, latency_per_text=0.0):
+        self.dim = dim
+        self.latency_per_text = latency_per_text
+        self.calls = 0
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in tokenize(text):
+            digest = zlib.crc32(token.encode())
+            vector[digest % self.dim] += 1.0 if digest & 1 << 31 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.latency_per_text:
+            time.sleep(self.latency_per_text * len(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+class InMemoryVectorStore:
+    """ChunkVectorStore's search methods over chunks held in memory.
+    Distances are exact cosine distances computed with one matrix product."""
+
+    def __init__(self, embedding_function, chunks, lexical_index=None):
+        self.embeddings = embedding_function
+        self.lexical_index = lexical_index
+        self.chunks = list(chunks)
+        self.documents = [ChunkVectorStore._to_document(chunk) for chunk in self.chunks]
+        self.matrix = np.asarray([chunk.embedding for chunk in self.chunks], dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        self.matrix /= np.maximum(np.linalg.norm(self.matrix, axis=1, keepdims=True), 1e-12)
+        self.keys = {(chunk.article_id, chunk.chunk_index): i for i, chunk in enumerate(self.chunks)}
+        self.published_at = np.array([chunk.published_at for chunk in self.chunks], dtype="datetime64[us]")
+
+    @classmethod
+    def from_session(cls, db, embedding_function, lexical_index=None):
+        """Load every chunk of a (seeded SQLite) database"""
+        return cls(embedding_function, db.query(ArticleChunk).all(), lexical_index)
+
+    def _mask(self, filter):
+        mask = np.ones(len(self.chunks), dtype=bool)
+        for key, value in (filter or {}).items():
+            if key == "published_after":
+                mask &= self.published_at >= np.datetime64(value)
+            elif key == "published_before":
+                mask &= self.published_at < np.datetime64(value)
+            elif key in ChunkVectorStore.FILTER_COLUMNS:
+                allowed = set(value) if isinstance(value, (list, tuple, set)) else {value}
+                mask &= np.array([getattr(chunk, key) in allowed for chunk in self.chunks], dtype=bool)
+            else:
+                raise ValueError(f"Unsupported vector filter: {key}")
+        return mask
+
+    def _distances(self, embeddings):
+        queries = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        return 1.0 - queries @ self.matrix.T
+
+    def _result(self, i, distance, with_embeddings):
+        if with_embeddings:
+            return (self.documents[i], float(distance), self.matrix[i])
+        return (self.documents[i], float(distance))
+
+    def similarity_search_by_vectors_with_score(self, embeddings, k=4, filter=None, with_embeddings=False):
+        if not len(embeddings) or not self.chunks:
+            return [[] for _ in embeddings]
+        distances = self._distances(embeddings)
+        distances[:, ~self._mask(filter)] = np.inf
+        results = []
+        for row in distances:
+            top = np.argsort(row)[:k]
+            results.append([self._result(i, row[i], with_embeddings) for i in top if np.isfinite(row[i])])
+        return results
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, filter=None, ef_search=None, exact=False, with_embeddings=False):
+        return self.similarity_search_by_vectors_with_score([embedding], k, filter, with_embeddings)[0]
+
+    def similarity_search_with_score(self, query, k=4, filter=None):
+        return self.similarity_search_by_vector_with_score(self.embeddings.embed_query(query), k=k, filter=filter)
+
+    def get_chunks(self, keys):
+        return [(self.documents[self.keys[key]], self.matrix[self.keys[key]]) for key in keys if key in self.keys]
+
+    def get_chunks_with_score(self, embedding, keys, with_embeddings=False):
+        indexes = [self.keys[key] for key in keys if key in self.keys]
+        if not indexes:
+            return []
+        distances = self._distances([embedding])[0]
+        return [self._result(i, distances[i], with_embeddings) for i in indexes]
+
+def seed_corpus(db, embedding_function, num_articles=200, sentences_per_article=40, seed=0):
+    """Fill an empty database with synthetic articles and their embedded chunks.
+    Every article is about one named entity ("Entity17"), so questions about
+    known entities retrieve well and questions about unknown ones fall back."""
+    rng = random.Random(seed)
+    topics = ["Technology", "Business", "Health", "Politics", "Sports", "Science"]
+    # A wide vocabulary keeps the entity name the dominant shared term
+    vocabulary = [f"term{n}" for n in range(5000)]
+    now = datetime.now()
+
+    for article_number in range(num_articles):
+        entity = f"Entity{article_number}"
+        topic = topics[article_number % len(topics)]
+        sentences = [
+            f"{entity} {' '.join(rng.choices(vocabulary, k=10))}."
+            for _ in range(sentences_per_article)
+        ]
+        published_at = now - timedelta(days=rng.uniform(0, 20))
+        article = NewsArticle(
+            title=f"{entity} {topic.lower()} update",
+            url=f"https://news.example.com/{article_number}",
+            source=rng.choice(["Reuters", "AP", "BBC"]),
+            body=" ".join(sentences),
+            published_at=published_at,
+            topic=topic,
+            is_processed=True,
+            is_embedded=True,
+        )
+        db.add(article)
+        db.flush()
+
+        # ~2500-character chunks overlapping by two sentences, like the text splitter
+        texts = [" ".join(sentences[start:start + 16]) for start in range(0, sentences_per_article - 2, 14)]
+        for chunk_index, (content, embedding) in enumerate(zip(texts, embedding_function.embed_documents(texts))):
+            db.add(ArticleChunk(
+                article_id=article.id,
+                chunk_index=chunk_index,
+                topic=topic,
+                source=article.source,
+                published_at=published_at,
+                title=article.title,
+                url=article.url,
+                content=content,
+                token_count=count_tokens(content),
+                embedding=embedding,
+            ))
+    db.commit()
@@ -0,0 +1,122 @@
+import heapq
+import math
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+# Chunks are identified by (article_id, chunk_index), like in article_chunks
+ChunkKey = Tuple[int, int]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.&'-][a-z0-9]+)*")
+STOPWORDS = frozenset("""
+a an and are as at be been but by did do does for from had has have how i if in into is it its
+me my of on or our so than that the their them then there these they this to was we were what
+when where which who whom why will with would you your about any latest news new happened
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords; keeps tickers and names like u.s. or at&t"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    """In-memory inverted index over chunk text, scored with Okapi BM25.
+    Postings map term -> {chunk key: term frequency}; only ids and counts are
+    kept, the chunk text itself stays in the database.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[ChunkKey, int]] = defaultdict(dict)
+        self.doc_lengths: Dict[ChunkKey, int] = {}
+        self.doc_terms: Dict[ChunkKey, Tuple[str, ...]] = {}
+        self.article_chunks: Dict[int, List[ChunkKey]] = defaultdict(list)
+        self.article_dates: Dict[int, datetime] = {}
+        self.total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def _remove_article(self, article_id: int):
+        for key in self.article_chunks.pop(article_id, []):
+            for term in self.doc_terms.pop(key, ()):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(key, None)
+                    if not postings:
+                        del self.postings[term]
+            self.total_length -= self.doc_lengths.pop(key, 0)
+        self.article_dates.pop(article_id, None)
+
+    def _index_chunk(self, article_id: int, chunk_index: int, text: str):
+        key = (article_id, chunk_index)
+        tokens = tokenize(text)
+        frequencies = defaultdict(int)
+        for token in tokens:
+            frequencies[token] += 1
+
+        for term, frequency in frequencies.items():
+            self.postings[term][key] = frequency
+        self.doc_terms[key] = tuple(frequencies)
+        self.doc_lengths[key] = len(tokens)
+        self.total_length += len(tokens)
+        self.article_chunks[article_id].append(key)
+
+    def add_article(self, article_id: int, published_at: datetime, chunks: Iterable[str]):
+        """Index an article's chunks in order, replacing any previous version"""
+        with self._lock:
+            self._remove_article(article_id)
+            for chunk_index, text in enumerate(chunks):
+                self._index_chunk(article_id, chunk_index, text)
+            self.article_dates[article_id] = published_at
+
+    def add_chunk(self, article_id: int, chunk_index: int, published_at: datetime, text: str):
+        """Index one chunk (used when hydrating from the database)"""
+        with self._lock:
+            if (article_id, chunk_index) in self.doc_lengths:
+                return
+            self._index_chunk(article_id, chunk_index, text)
+            self.article_dates[article_id] = published_at
+
+    def remove_articles(self, article_ids: Iterable[int]):
+        with self._lock:
+            for article_id in article_ids:
+                self._remove_article(article_id)
+
+    def remove_older_than(self, cutoff: datetime) -> int:
+        """Drop articles published before cutoff; returns how many were removed"""
+        with self._lock:
+            expired = [article_id for article_id, published_at in self.article_dates.items() if published_at < cutoff]
+            for article_id in expired:
+                self._remove_article(article_id)
+            return len(expired)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[ChunkKey, float, float]]:
+        """Top-k chunks as (key, bm25 score, share of distinct query terms matched)"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            doc_count = len(self.doc_lengths)
+            if not doc_count:
+                return []
+            avg_length = self.total_length / doc_count
+
+            scores: Dict[ChunkKey, float] = defaultdict(float)
+            matched: Dict[ChunkKey, int] = defaultdict(int)
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[key] / avg_length)
+                    scores[key] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+                    matched[key] += 1
+
+        ranked = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(key, score, matched[key] / len(terms)) for key, score in ranked]
@@ -1,6 +1,211 @@
-def retrieve_chunks(vector_store, question, k=10):
-    """Retrieve top-k chunks and return with similarity scores"""
-    results = vector_store.similarity_search_with_score(question, k=k)
-    chunks, scores = zip(*results) if results else ([], [])
-    return list(chunks), list(scores)
+from datetime import datetime, timedelta
 
+import numpy as np
+
+from app.scripts.utils.should_fallback_to_web import should_fallback_to_web
+from app.scripts.retrieval.mmr import mmr_select
+
+# Publication windows (days back) searched in order. Most questions are about
+# recent news, so the small hot partitions are searched first and the search
+# widens only when the scores would otherwise trigger the web fallback.
+SEARCH_WINDOWS_DAYS = (7, 30, None)
+
+# Reciprocal rank fusion constant (standard value from the RRF paper)
+RRF_K = 60
+
+# MMR trade-off between relevance (1.0) and diversity (0.0), and how many
+# candidates to diversify from per returned chunk
+MMR_LAMBDA = 0.5
+MMR_FETCH_FACTOR = 2
+
+# Adaptive k: the full candidate list is fetched once and cut at the first
+# relevance cliff, i.e. a jump of at least SCORE_GAP in cosine distance between
+# consecutive candidates, or a candidate more than RELEVANCE_SPREAD worse than
+# the best one
+ADAPTIVE_MIN_K = 3
+SCORE_GAP = 0.08
+RELEVANCE_SPREAD = 0.2
+
+def cosine_distance(a, b):
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    return float(1.0 - a @ b / max(np.linalg.norm(a) * np.linalg.norm(b), 1e-12))
+
+def chunk_key(doc):
+    return (doc.metadata["article_id"], doc.metadata["chunk_index"])
+
+def vector_search(vector_store, embedding, k, windows=SEARCH_WINDOWS_DAYS):
+    """Dense search over widening publication windows; (doc, distance, embedding) triples"""
+    results = []
+    for days in windows:
+        filter = {"published_after": datetime.now() - timedelta(days=days)} if days else None
+        results = vector_store.similarity_search_by_vector_with_score(
+            embedding, k=k, filter=filter, with_embeddings=True
+        )
+        if len(results) >= k and not should_fallback_to_web([score for _, score, _ in results]):
+            break
+    return results
+
+def find_score_cliff(scores, min_k=ADAPTIVE_MIN_K, gap=SCORE_GAP, spread=RELEVANCE_SPREAD):
+    """Index of the first candidate past a relevance cliff, or None.
+    scores are ascending cosine distances; the first min_k are always kept."""
+    for i in range(max(min_k, 1), len(scores)):
+        if scores[i] - scores[i - 1] >= gap or scores[i] - scores[0] > spread:
+            return i
+    return None
+
+def adaptive_vector_search(vector_store, embedding, max_k, min_k=ADAPTIVE_MIN_K, windows=SEARCH_WINDOWS_DAYS):
+    """vector_search for max_k candidates, cut at the first score cliff.
+    A top-k list is a prefix of a larger one, so a single fetch of max_k
+    finds the first cliff without re-running the search for growing k."""
+    results = vector_search(vector_store, embedding, max_k, windows)
+    cliff = find_score_cliff([score for _, score, _ in results], min_k)
+    return results[:cliff] if cliff is not None else results
+
+def fuse_results(vector_results, lexical_hits, lexical_results, k):
+    """Reciprocal rank fusion of the dense ranking and the BM25 ranking.
+    Fusion only changes the order: every result keeps its real cosine
+    distance, so the web fallback decision is made on dense scores."""
+    documents = {}
+    fused = {}
+    for rank, result in enumerate(vector_results):
+        key = chunk_key(result[0])
+        documents[key] = result
+        fused[key] = fused.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+    for result in lexical_results:
+        documents.setdefault(chunk_key(result[0]), result)
+
+    for rank, (key, _, _) in enumerate(lexical_hits):
+        if key not in documents:
+            # Stale entry for a chunk deleted from the database
+            continue
+        fused[key] = fused.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+    ranked = sorted(fused, key=fused.get, reverse=True)[:k]
+    return [documents[key] for key in ranked]
+
+def diversify_results(query_embedding, results, k, lambda_mult=MMR_LAMBDA):
+    """Keep k results chosen by MMR so overlapping chunks and near-duplicate
+    articles do not fill the context with the same text"""
+    if len(results) <= 1:
+        return results[:k]
+    relevance = [1.0 - score for _, score, _ in results]
+    picks = mmr_select(
+        query_embedding,
+        [chunk_embedding for _, _, chunk_embedding in results],
+        k,
+        lambda_mult=lambda_mult,
+        relevance=relevance
+    )
+    return [results[i] for i in picks]
+
+def retrieve_chunks(
+    vector_store,
+    question,
+    k=10,
+    windows=SEARCH_WINDOWS_DAYS,
+    diversify=True,
+    query_embedding=None,
+    adaptive=True,
+    min_k=ADAPTIVE_MIN_K
+):
+    """Retrieve up to k chunks and return with similarity scores.
+    With adaptive=True dense candidates are cut at the first relevance cliff,
+    so clear-cut questions return fewer chunks (never fewer than min_k when
+    that many exist).
+    Dense results are fused with BM25 hits from the store's lexical index when
+    it has one, then diversified with MMR over MMR_FETCH_FACTOR * k candidates;
+    scores stay cosine distances (lower is better).
+    Pass query_embedding when the caller already embedded the question.
+    """
+    fetch_k = k * MMR_FETCH_FACTOR if diversify else k
+    embedding = query_embedding if query_embedding is not None else vector_store.embeddings.embed_query(question)
+    if adaptive:
+        results = adaptive_vector_search(vector_store, embedding, fetch_k, min_k, windows)
+        # Keep as many chunks as candidates survived the cliff, up to k
+        k = min(k, max(min_k, len(results)))
+    else:
+        results = vector_search(vector_store, embedding, fetch_k, windows)
+
+    lexical_index = getattr(vector_store, "lexical_index", None)
+    if lexical_index is not None and len(lexical_index):
+        lexical_hits = lexical_index.search(question, k=fetch_k)
+        seen = {chunk_key(doc) for doc, _, _ in results}
+        missing = [key for key, _, _ in lexical_hits if key not in seen]
+        lexical_results = vector_store.get_chunks_with_score(embedding, missing, with_embeddings=True)
+        results = fuse_results(results, lexical_hits, lexical_results, fetch_k)
+
+    if diversify:
+        results = diversify_results(embedding, results, k)
+    else:
+        results = results[:k]
+
+    chunks = [doc for doc, _, _ in results]
+    scores = [score for _, score, _ in results]
+    return chunks, scores
+
+def vector_search_batch(vector_store, embeddings, k, windows=SEARCH_WINDOWS_DAYS):
+    """vector_search for several embeddings; each window is one multi-query search
+    covering only the questions that still need a wider window"""
+    results = [[] for _ in embeddings]
+    pending = list(range(len(embeddings)))
+    for days in windows:
+        if not pending:
+            break
+        filter = {"published_after": datetime.now() - timedelta(days=days)} if days else None
+        found = vector_store.similarity_search_by_vectors_with_score(
+            [embeddings[i] for i in pending], k=k, filter=filter, with_embeddings=True
+        )
+        still_pending = []
+        for i, question_results in zip(pending, found):
+            results[i] = question_results
+            if len(question_results) < k or should_fallback_to_web([score for _, score, _ in question_results]):
+                still_pending.append(i)
+        pending = still_pending
+    return results
+
+def retrieve_chunks_batch(vector_store, questions, embeddings, k=10, windows=SEARCH_WINDOWS_DAYS, min_k=ADAPTIVE_MIN_K):
+    """retrieve_chunks for many questions with shared database work:
+    - dense candidates for all questions come from one multi-query search per window
+    - a chunk retrieved for several questions is loaded once and shared
+    - BM25-only hits of all questions are fetched in one query and scored locally
+    Returns one (chunks, scores) pair per question, cut at score cliffs and
+    diversified like retrieve_chunks.
+    """
+    fetch_k = k * MMR_FETCH_FACTOR
+    dense = vector_search_batch(vector_store, embeddings, fetch_k, windows)
+
+    shared = {}  # chunk key -> (document, embedding), one copy per chunk in the batch
+    for i, results in enumerate(dense):
+        cliff = find_score_cliff([score for _, score, _ in results], min_k)
+        kept = []
+        for doc, score, chunk_embedding in results[:cliff]:
+            doc, chunk_embedding = shared.setdefault(chunk_key(doc), (doc, chunk_embedding))
+            kept.append((doc, score, chunk_embedding))
+        dense[i] = kept
+
+    lexical_index = getattr(vector_store, "lexical_index", None)
+    lexical_hits = [[] for _ in questions]
+    if lexical_index is not None and len(lexical_index):
+        lexical_hits = [lexical_index.search(question, k=fetch_k) for question in questions]
+        missing = {key for hits in lexical_hits for key, _, _ in hits if key not in shared}
+        for doc, chunk_embedding in vector_store.get_chunks(list(missing)):
+            shared[chunk_key(doc)] = (doc, chunk_embedding)
+
+    batch = []
+    for question_embedding, results, hits in zip(embeddings, dense, lexical_hits):
+        question_k = min(k, max(min_k, len(results)))
+        if hits:
+            seen = {chunk_key(doc) for doc, _, _ in results}
+            lexical_results = []
+            for key, _, _ in hits:
+                if key in seen or key not in shared:
+                    continue
+                doc, chunk_embedding = shared[key]
+                lexical_results.append((doc, cosine_distance(question_embedding, chunk_embedding), chunk_embedding))
+            results = fuse_results(results, hits, lexical_results, fetch_k)
+
+        results = diversify_results(question_embedding, results, question_k)
+        batch.append(([doc for doc, _, _ in results], [score for _, score, _ in results]))
+    return batch
@@ -0,0 +1,40 @@
+import numpy as np
+
+def mmr_select(query_embedding, embeddings, k, lambda_mult=0.7, relevance=None):
+    """
+    Maximal marginal relevance over an embedding matrix.
+    Each step picks the candidate maximizing
+        lambda * relevance - (1 - lambda) * max similarity to already picked
+    relevance defaults to cosine similarity with the query.
+    Returns candidate indices in pick order.
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.ndim != 2 or not len(matrix):
+        return []
+    k = min(k, len(matrix))
+
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    if relevance is None:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        relevance = matrix @ query
+    else:
+        relevance = np.asarray(relevance, dtype=np.float32)
+
+    similarity = matrix @ matrix.T
+
+    first = int(np.argmax(relevance))
+    selected = [first]
+    max_similarity = similarity[first].copy()
+    available = np.ones(len(matrix), dtype=bool)
+    available[first] = False
+
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        available[pick] = False
+        np.maximum(max_similarity, similarity[pick], out=max_similarity)
+
+    return selected
@@ -9,7 +9,11 @@ def build_context_from_chunks(chunks, max_chars=1200, min_chunk_length=50):
         if len(content) < min_chunk_length:
             continue
 
-        clean = re.sub(r'\s+', ' ', content)
+        # Chunks with a token_count were normalized at index time
+        if chunk.metadata.get("token_count") is not None:
+            clean = content
+        else:
+            clean = re.sub(r'\s+', ' ', content)
         chunk_len = len(clean)
 
         if total_chars + chunk_len > max_chars:
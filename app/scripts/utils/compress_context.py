@@ -0,0 +1,65 @@
+import re
+
+import numpy as np
+
+from app.scripts.utils.count_tokens import count_tokens
+
+SENTENCE_BOUNDARY = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[\"'(\[]?[A-Z0-9])")
+
+def split_sentences(text, min_chars=25):
+    """Split on sentence punctuation; fragments shorter than min_chars join the previous sentence"""
+    sentences = []
+    for part in SENTENCE_BOUNDARY.split(text):
+        if sentences and len(part) < min_chars:
+            sentences[-1] = f"{sentences[-1]} {part}"
+        else:
+            sentences.append(part)
+    return sentences
+
+def compress_articles(articles, question_embedding, embedding_function, max_tokens=2500):
+    """
+    Extractive compression of merged articles (see merge_article_chunks).
+    Every sentence is embedded in one embed_documents batch and scored by
+    cosine similarity to the question with a single matrix product; the
+    best sentences are kept until max_tokens, then put back in document order.
+    Returns the articles with compressed text; articles keep their position
+    (an article with no kept sentence gets empty text) so citations still line up.
+    """
+    total_tokens = sum(article["token_count"] for article in articles)
+    if total_tokens <= max_tokens:
+        return articles
+
+    owners = []
+    sentences = []
+    for article_number, article in enumerate(articles):
+        for sentence in split_sentences(article["text"]):
+            owners.append(article_number)
+            sentences.append(sentence)
+    if not sentences:
+        return articles
+
+    matrix = np.asarray(embedding_function.embed_documents(sentences), dtype=np.float32)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(question_embedding, dtype=np.float32)
+    # Not in place: asarray returns the caller's array when it is already float32
+    query = query / max(np.linalg.norm(query), 1e-12)
+    scores = matrix @ query
+
+    # Same tokenizer as the index-time token_count, so the budget is in one unit
+    sentence_tokens = [count_tokens(sentence) for sentence in sentences]
+    kept = set()
+    used_tokens = 0
+    for position in np.argsort(-scores):
+        if used_tokens + sentence_tokens[position] > max_tokens:
+            continue
+        kept.add(int(position))
+        used_tokens += sentence_tokens[position]
+
+    compressed = []
+    for article_number, article in enumerate(articles):
+        positions = [i for i, owner in enumerate(owners) if owner == article_number and i in kept]
+        text = " ".join(sentences[i] for i in positions)
+        compressed.append({**article, "text": text, "token_count": sum(sentence_tokens[i] for i in positions)})
+
+    print(f"Compressed context: kept {len(kept)}/{len(sentences)} sentences (~{used_tokens:.0f} of ~{total_tokens:.0f} tokens)")
+    return compressed
@@ -0,0 +1,38 @@
+import logging
+import re
+from functools import lru_cache
+
+# Fallback estimate when tiktoken is unavailable; every token budget in the
+# pipeline (index-time token_count, context packing, truncation) uses count_tokens
+CHARS_PER_TOKEN = 3.5
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Load the tokenizer once; None if tiktoken or its BPE file is unavailable"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logging.warning(f"tiktoken unavailable, falling back to character estimate: {e}")
+        return None
+
+def normalize_whitespace(text):
+    """Collapse all whitespace runs to single spaces"""
+    return re.sub(r'\s+', ' ', text).strip()
+
+def count_tokens(text):
+    """Token count with the cl100k_base tokenizer (~3.5 chars/token if unavailable)"""
+    encoding = _get_encoding()
+    if encoding is None:
+        return int(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text, max_tokens):
+    """Longest prefix of text within max_tokens, in count_tokens units"""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:int(max_tokens * CHARS_PER_TOKEN)]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -0,0 +1,17 @@
+import re
+from datetime import datetime
+
+TIME_SENSITIVE_PATTERN = re.compile(
+    r"\b(today|tonight|yesterday|now|right now|currently|current|latest|breaking|live|"
+    r"this (?:morning|afternoon|evening|week|weekend|month)|just|ongoing|update[sd]?|"
+    r"score|scores|price|prices|stock|stocks|election results?|weather|forecast)\b"
+)
+
+def is_time_sensitive(question):
+    """Heuristic: does the question ask about something happening right now?
+    These are the questions the local archive most often cannot answer yet."""
+    text = question.lower()
+    if TIME_SENSITIVE_PATTERN.search(text):
+        return True
+    # Mentions of the current year ("... in 2026") usually mean fresh events
+    return str(datetime.now().year) in text
@@ -0,0 +1,67 @@
+from app.scripts.utils.count_tokens import count_tokens
+
+def find_overlap(left, right, max_overlap=1000, min_overlap=20):
+    """Length of the longest suffix of left that is also a prefix of right.
+    Consecutive chunks from the text splitter share up to chunk_overlap
+    characters; shorter matches than min_overlap are treated as chance."""
+    tail = left[-max_overlap:]
+    probe = right[:min_overlap]
+    if len(probe) < min_overlap:
+        return 0
+    start = tail.find(probe)
+    while start != -1:
+        if right.startswith(tail[start:]):
+            return len(tail) - start
+        start = tail.find(probe, start + 1)
+    return 0
+
+def merge_article_chunks(chunks):
+    """
+    Group retrieved chunks by article, in order of each article's best-ranked
+    chunk. Within an article, chunks are put back in chunk_index order;
+    adjacent ones are joined with their overlap removed, gaps are marked "...".
+    Returns dicts with the article's metadata, merged text and token estimate.
+    """
+    articles = {}
+    for chunk in chunks:
+        article_id = chunk.metadata.get("article_id")
+        # Chunks without an article id (older indexes) stay on their own
+        key = article_id if article_id is not None else ("chunk", len(articles))
+        articles.setdefault(key, []).append(chunk)
+
+    merged = []
+    for article_chunks in articles.values():
+        article_chunks.sort(key=lambda chunk: chunk.metadata.get("chunk_index", 0))
+        text = ""
+        previous_index = None
+        total_tokens = 0
+        total_chars = 0
+        for chunk in article_chunks:
+            content = chunk.page_content
+            chunk_index = chunk.metadata.get("chunk_index", 0)
+            token_count = chunk.metadata.get("token_count")
+            total_tokens += token_count if token_count is not None else count_tokens(content)
+            total_chars += len(content)
+
+            if not text:
+                text = content
+            elif previous_index is not None and chunk_index == previous_index + 1:
+                overlap = find_overlap(text, content)
+                text = f"{text}{content[overlap:]}" if overlap else f"{text} {content}"
+            else:
+                text = f"{text} ... {content}"
+            previous_index = chunk_index
+
+        metadata = article_chunks[0].metadata
+        merged.append({
+            "article_id": metadata.get("article_id"),
+            "title": metadata.get("title"),
+            "url": metadata.get("url"),
+            "source": metadata.get("source"),
+            "published_at": metadata.get("published_at"),
+            "chunk_indexes": [chunk.metadata.get("chunk_index") for chunk in article_chunks],
+            "text": text,
+            # Scale the indexed token counts by the share of text left after merging
+            "token_count": total_tokens * len(text) / total_chars if total_chars else 0,
+        })
+    return merged
@@ -0,0 +1,8 @@
+import re
+
+def normalize_query(text):
+    """Canonical form of a question for cache and coalescing keys:
+    lowercased, punctuation dropped, whitespace collapsed"""
+    text = re.sub(r"['\u2019]", "", text.lower())
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
@@ -1,10 +1,58 @@
 import os
+import json
+import math
 
-def should_fallback_to_web(scores, threshold=0.4):
-    """Fallback if majority of scores are weak"""    
+import numpy as np
+
+# Logistic model of P(the local archive can answer) from retrieved cosine
+# distances, using the best distance and the mean of the top 3. Neither
+# feature depends on how many chunks were retrieved, so the decision is
+# stable under adaptive k. The defaults are hand-set heuristics, not fitted:
+# they put the 50% point at best ~0.33 with top-3 mean ~0.42, close to the old
+# "55% of scores above 0.4" rule. Fit real coefficients on labelled questions
+# with app/scripts/benchmarks/fit_fallback_model.py and point
+# FALLBACK_MODEL_PATH at the JSON it writes.
+DEFAULT_FALLBACK_MODEL = {"bias": 6.0, "best": -8.0, "top3": -8.0}
+
+def _load_model():
+    path = os.getenv("FALLBACK_MODEL_PATH")
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return {**DEFAULT_FALLBACK_MODEL, **json.load(f)}
+    return DEFAULT_FALLBACK_MODEL
+
+FALLBACK_MODEL = _load_model()
+
+def fallback_features(scores):
+    ordered = sorted(scores)
+    return ordered[0], sum(ordered[:3]) / len(ordered[:3])
+
+def local_answer_probability(scores, model=None):
+    """Estimated probability that the retrieved chunks answer the question"""
+    model = model or FALLBACK_MODEL
+    best, top3 = fallback_features(scores)
+    logit = model["bias"] + model["best"] * best + model["top3"] * top3
+    return 1.0 / (1.0 + math.exp(-logit))
+
+def should_fallback_to_web(scores, min_probability=0.5, model=None):
+    """Fallback when the archive is unlikely to answer (see FALLBACK_MODEL)"""
 
     if not scores:
         print("No scores available for fallback check")
         return True
-    weak_count = sum(score > threshold for score in scores)
-    return weak_count >= len(scores) * 0.55  # fallback if 55% or more scores are weak
+    return local_answer_probability(scores, model) < min_probability
+
+def fit_fallback_model(score_lists, labels, epochs=2000, learning_rate=0.5):
+    """Fit the logistic model by gradient descent.
+    score_lists: retrieved distances per question; labels: 1 if the local
+    answer was judged good, 0 if the web was needed. Returns a model dict."""
+    features = np.array([fallback_features(scores) for scores in score_lists], dtype=np.float64)
+    targets = np.asarray(labels, dtype=np.float64)
+    weights = np.zeros(features.shape[1])
+    bias = 0.0
+    for _ in range(epochs):
+        predictions = 1.0 / (1.0 + np.exp(-(features @ weights + bias)))
+        error = predictions - targets
+        weights -= learning_rate * features.T @ error / len(targets)
+        bias -= learning_rate * error.mean()
+    return {"bias": float(bias), "best": float(weights[0]), "top3": float(weights[1])}
@@ -14,6 +14,7 @@ class AIService:
     def __init__(self):
         self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
         self.rate_limit_delay = 1.2  # Seconds between API calls
+        self.max_body_chars = 2000  # Body prefix sent for classification
         self.last_call_time = 0
         
     async def _rate_limit(self):
@@ -33,7 +34,7 @@ class AIService:
         1. Topic classification (choose ONE from: Technology, Business, Health, Environment, Politics, Sports, Entertainment, Science, General)
         2. A concise 5-10 sentence summary
         
-        Article Body: {body[:2000]}...  # Limit body length
+        Article Body: {body[:self.max_body_chars]}...  # Limit body length
         
         Response format:
         TOPIC: [topic]
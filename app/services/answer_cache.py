@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+class SemanticAnswerCache:
+    """Cache of generated answers keyed by question embedding.
+
+    A question whose embedding is within similarity_threshold (cosine) of a
+    cached question, and younger than ttl_seconds, reuses that answer.
+    Entries are invalidated when:
+      - an article they cite is re-embedded or deleted
+      - a newly embedded chunk would itself be a relevant hit for the cached
+        question (cosine >= relevance_threshold), since it may change the answer
+
+    bge-small similarities are compressed: unrelated news text commonly scores
+    0.5-0.65 against a question, so a lower relevance_threshold would flush most
+    entries on every embedding run. 0.7 (cosine distance 0.3) only counts
+    chunks that would be a confident top hit, just inside the web fallback
+    model's 50% point (best distance ~0.33, see should_fallback_to_web).
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.92,
+        relevance_threshold: float = 0.7,
+        ttl_seconds: int = 1800,
+        max_entries: int = 500
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.relevance_threshold = relevance_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._entries: List[Dict] = []
+        self._matrix = None  # normalized question embeddings, one row per entry
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    def _rebuild(self):
+        self._matrix = (
+            np.vstack([entry["embedding"] for entry in self._entries]) if self._entries else None
+        )
+
+    def _drop(self, keep: List[bool]) -> int:
+        removed = len(keep) - sum(keep)
+        if removed:
+            self._entries = [entry for entry, kept in zip(self._entries, keep) if kept]
+            self._rebuild()
+        return removed
+
+    def _expire(self, now: float):
+        self._drop([now - entry["created_at"] < self.ttl_seconds for entry in self._entries])
+
+    def lookup(self, question_embedding) -> Optional[Dict]:
+        """Cached result for a similar enough, fresh question, or None"""
+        with self._lock:
+            self._expire(time.time())
+            if self._matrix is None:
+                self.misses += 1
+                return None
+
+            similarities = self._matrix @ self._normalize(question_embedding)[0]
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            entry = self._entries[best]
+            logging.info(f"Answer cache hit ({similarities[best]:.3f}) for: {entry['question']}")
+            return entry["result"]
+
+    def store(self, question: str, question_embedding, result: Dict, article_ids: Iterable[int] = ()):
+        """Cache a result together with the ids of the articles it cites"""
+        with self._lock:
+            now = time.time()
+            self._expire(now)
+            if len(self._entries) >= self.max_entries:
+                # Entries are appended in time order; drop the oldest
+                self._entries = self._entries[len(self._entries) - self.max_entries + 1:]
+
+            self._entries.append({
+                "question": question,
+                "embedding": self._normalize(question_embedding)[0],
+                "result": result,
+                "article_ids": set(article_ids),
+                "created_at": now,
+            })
+            self._rebuild()
+
+    def invalidate_articles(self, article_ids: Iterable[int], chunk_embeddings=None) -> int:
+        """Drop entries citing these articles, or whose question the new chunks answer"""
+        article_ids = set(article_ids)
+        with self._lock:
+            if not self._entries:
+                return 0
+
+            keep = [not (entry["article_ids"] & article_ids) for entry in self._entries]
+            if chunk_embeddings is not None and len(chunk_embeddings):
+                relevance = self._matrix @ self._normalize(chunk_embeddings).T
+                overlapping = relevance.max(axis=1) >= self.relevance_threshold
+                keep = [kept and not overlap for kept, overlap in zip(keep, overlapping)]
+
+            removed = self._drop(keep)
+
+        if removed:
+            logging.info(f"Invalidated {removed} cached answers ({len(article_ids)} articles changed)")
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._matrix = None
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
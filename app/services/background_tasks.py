@@ -10,6 +10,9 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
 from app.services.fetch_bbc_content import fetch_clean_article_content
+from app.services.cleanup import prune_old_content, compact_storage
+from app.infra.response_cache import catalog_cache
+from app.databases.article_stats import read_article_stats, rebuild_article_stats
 from datetime import datetime, timedelta
 
 class BackgroundTaskService:
@@ -100,6 +103,8 @@ class BackgroundTaskService:
                 except Exception as e:
                     logging.error(f"Error saving article: {e}")
                     
+            if new_count:
+                catalog_cache.invalidate("ingest")
             logging.info(f"Added {new_count} new articles")
             print(f"Added {new_count} new articles")
         finally:
@@ -112,7 +117,9 @@ class BackgroundTaskService:
         db = SessionLocal()
         try:
             # Get unprocessed articles
-            unprocessed = self.news_service.get_unprocessed_articles(db, limit=20)
+            unprocessed = self.news_service.get_unprocessed_articles(
+                db, limit=20, body_chars=self.ai_service.max_body_chars
+            )
             
             if not unprocessed:
                 logging.info("No articles to process")
@@ -124,6 +131,8 @@ class BackgroundTaskService:
             # Update database
             for article_id, topic, summary in results:
                 self.news_service.update_article_ai_data(db, article_id, topic, summary)
+            if results:
+                catalog_cache.invalidate("processing")
             
             logging.info(f"Processed {len(results)} articles")
             print(f"Processed {len(results)} articles")
@@ -152,13 +161,7 @@ class BackgroundTaskService:
             
             # Update database to mark articles as embedded
             if successful_ids:
-                db.query(NewsArticle).filter(
-                    NewsArticle.id.in_(successful_ids)
-                ).update(
-                    {NewsArticle.is_embedded: True},
-                    synchronize_session=False
-                )
-                db.commit()
+                self.news_service.mark_articles_as_embedded(db, successful_ids)
                 
                 logging.info(f"Successfully embedded {len(successful_ids)} articles")
                 print(f"Successfully embedded {len(successful_ids)} articles")
@@ -167,47 +170,58 @@ class BackgroundTaskService:
         finally:
             db.close()
     
-    async def cleanup_old_content(self):
+    async def backfill_article_neighbors(self) -> int:
+        """Compute missing similar-article lists in a worker thread (one vector search per article)"""
+        try:
+            return await asyncio.get_event_loop().run_in_executor(
+                None, self.vector_service.backfill_article_neighbors
+            )
+        except Exception as e:
+            logging.error(f"Error backfilling article neighbors: {e}")
+            return 0
+    
+    async def cleanup_old_content(self, article_retention_days: int = 60, vector_retention_days: int = 45) -> dict:
         """Clean up old articles and vectors (free tier management)"""
         logging.info("Starting daily cleanup...")
         
         db = SessionLocal()
         try:
-            # Define retention periods
-            ARTICLE_RETENTION_DAYS = 60  # Keep articles for 60 days
-            VECTOR_RETENTION_DAYS = 45   # Keep vectors for 45 days
-            
-            cutoff_date = datetime.now() - timedelta(days=ARTICLE_RETENTION_DAYS)
-            vector_cutoff_date = datetime.now() - timedelta(days=VECTOR_RETENTION_DAYS)
+            report = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: prune_old_content(
+                    db,
+                    max_articles=None,
+                    max_days=article_retention_days,
+                    vector_max_days=min(vector_retention_days, article_retention_days)
+                )
+            )
+            if report["deleted_articles"]:
+                catalog_cache.invalidate("cleanup")
+                self.vector_service.answer_cache.invalidate_articles(report["deleted_article_ids"])
+            logging.info(
+                f"Deleted {report['deleted_articles']} old articles and "
+                f"{report['deleted_vectors'] + report['dropped_vectors']} vectors, "
+                f"reclaimed {report['bytes_reclaimed']} bytes"
+            )
             
-            # Get old articles to be deleted
-            old_articles = db.query(NewsArticle).filter(
-                NewsArticle.published_at < cutoff_date
-            ).all()
+            self.vector_service.lexical_index.remove_older_than(
+                datetime.now() - timedelta(days=min(vector_retention_days, article_retention_days))
+            )
             
-            if old_articles:
-                old_article_ids = [article.id for article in old_articles]
-                
-                # First, clean up vectors for these articles
-                await self.vector_service.cleanup_vectors_by_article_ids(old_article_ids)
-                
-                # Then delete the articles
-                deleted_count = db.query(NewsArticle).filter(
-                    NewsArticle.id.in_(old_article_ids)
-                ).delete(synchronize_session=False)
-                
-                db.commit()
-                logging.info(f"Deleted {deleted_count} old articles and their vectors")
-            
-            # Also clean up orphaned vectors (vectors older than retention period)
-            await self.vector_service.cleanup_old_vectors(days_old=VECTOR_RETENTION_DAYS)
+            # Dropped partitions take their index with them; only row deletes degrade the HNSW graph
+            if report["deleted_vectors"]:
+                await asyncio.get_event_loop().run_in_executor(
+                    None, self.vector_service.maintain_ann_index, report["deleted_vectors"]
+                )
             
             # Log current storage stats
             stats = self.vector_service.get_vector_stats()
             logging.info(f"Vector storage stats: {stats}")
+            return report
             
         except Exception as e:
             logging.error(f"Error during cleanup: {e}")
+            return {"error": str(e)}
         finally:
             db.close()
     
@@ -217,23 +231,17 @@ class BackgroundTaskService:
         
         db = SessionLocal()
         try:
-            # Get database stats
-            total_articles = db.query(NewsArticle).count()
-            processed_articles = db.query(NewsArticle).filter(
-                NewsArticle.is_processed == True
-            ).count()
-            embedded_articles = db.query(NewsArticle).filter(
-                NewsArticle.is_embedded == True
-            ).count()
-            
-            # Get vector stats
-            vector_stats = self.vector_service.get_vector_stats()
+            # Recount the stats counters from scratch to correct any drift
+            rebuild_article_stats(db)
+            stats = read_article_stats(db)
+            totals = stats["articles"]["totals"]
+            vector_stats = stats["vectors"]
             
             # Log comprehensive stats
             maintenance_stats = {
-                "total_articles": total_articles,
-                "processed_articles": processed_articles,
-                "embedded_articles": embedded_articles,
+                "total_articles": totals["articles"],
+                "processed_articles": totals["processed"],
+                "embedded_articles": totals["embedded"],
                 "vector_stats": vector_stats,
                 "timestamp": datetime.now().isoformat()
             }
@@ -245,10 +253,9 @@ class BackgroundTaskService:
                 logging.warning("Vector count high, performing aggressive cleanup")
                 await self.vector_service.cleanup_old_vectors(days_old=30)
             
-            # Vacuum database if using PostgreSQL
+            # Vacuum the content tables (runs outside the session's transaction)
             try:
-                db.execute(text("VACUUM ANALYZE;"))
-                db.commit()
+                compact_storage()
                 logging.info("Database vacuum completed")
             except Exception as e:
                 logging.warning(f"Could not vacuum database: {e}")
@@ -258,36 +265,21 @@ class BackgroundTaskService:
         finally:
             db.close()
     
-    async def get_system_status(self):
-        """Get current system status for monitoring"""
+    async def get_system_status(self, stats: dict = None):
+        """Get current system status for monitoring; reuses stats from read_article_stats if given"""
         db = SessionLocal()
         try:
-            # Article stats
-            total_articles = db.query(NewsArticle).count()
-            recent_articles = db.query(NewsArticle).filter(
-                NewsArticle.published_at >= datetime.now() - timedelta(days=7)
-            ).count()
-            
-            unprocessed_articles = db.query(NewsArticle).filter(
-                NewsArticle.is_processed == False
-            ).count()
-            
-            unembedded_articles = db.query(NewsArticle).filter(
-                NewsArticle.is_processed == True,
-                NewsArticle.is_embedded == False
-            ).count()
-            
-            # Vector stats
-            vector_stats = self.vector_service.get_vector_stats()
+            stats = stats or read_article_stats(db)
+            totals = stats["articles"]["totals"]
             
             return {
                 "articles": {
-                    "total": total_articles,
-                    "recent_week": recent_articles,
-                    "unprocessed": unprocessed_articles,
-                    "unembedded": unembedded_articles
+                    "total": totals["articles"],
+                    "recent_week": totals["recent_week"],
+                    "unprocessed": totals["unprocessed"],
+                    "unembedded": totals["unembedded"]
                 },
-                "vectors": vector_stats,
+                "vectors": stats["vectors"],
                 "last_updated": datetime.now().isoformat()
             }
             
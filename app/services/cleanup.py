@@ -1,44 +1,171 @@
+import logging
 from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import desc, select, text, union
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from app.scripts.utils.get_vector_store import get_vector_store
 
-def prune_old_content(db: Session, max_articles=500, max_days=90):
+from app.databases.database import engine
+from app.databases.chunk_partitions import drop_chunk_partitions_before, week_start
+from app.databases.article_neighbors import delete_article_neighbors
+from app.databases.article_stats import (
+    ARTICLE_STAT_COLUMNS, chunk_day_counts, drop_chunk_days_before, record_articles, record_chunks
+)
+from app.databases.models import ArticleChunk, NewsArticle
+
+# Retention engine for articles and their vector chunks
+# - Weekly chunk partitions that are fully expired are dropped outright
+# - Expired article ids are computed with one query over the published_at index
+# - Articles and chunks are deleted in bounded bulk statements (one per batch)
+# - Storage is compacted afterwards and the reclaimed bytes are reported
+
+def get_expired_article_ids(
+    db: Session,
+    max_days: int,
+    max_articles: Optional[int] = None
+) -> List[int]:
+    """Ids of articles older than max_days or beyond the newest max_articles"""
+    cutoff = datetime.now() - timedelta(days=max_days)
+    expired = select(NewsArticle.id).where(NewsArticle.published_at < cutoff)
+
+    if max_articles is not None:
+        # count-based cap (global; change to per-topic if you prefer)
+        over_cap = select(NewsArticle.id).order_by(
+            desc(NewsArticle.published_at), desc(NewsArticle.id)
+        ).offset(max_articles).subquery()
+        expired = union(expired, select(over_cap.c.id))
+
+    return list(db.execute(expired).scalars().all())
+
+def delete_articles_in_batches(db: Session, article_ids: List[int], batch_size: int = 500) -> dict:
+    """Delete articles and their chunks, one bulk DELETE per table per batch"""
+    deleted_articles = 0
+    deleted_vectors = 0
+
+    for start in range(0, len(article_ids), batch_size):
+        batch = article_ids[start:start + batch_size]
+
+        # Counters leave with the rows, in the same transaction
+        record_chunks(db, chunk_day_counts(db, ArticleChunk.article_id.in_(batch)), sign=-1)
+        record_articles(db, db.query(*ARTICLE_STAT_COLUMNS).filter(NewsArticle.id.in_(batch)).all(), sign=-1)
+        delete_article_neighbors(db, batch)
+        deleted_vectors += db.query(ArticleChunk).filter(
+            ArticleChunk.article_id.in_(batch)
+        ).delete(synchronize_session=False)
+        deleted_articles += db.query(NewsArticle).filter(
+            NewsArticle.id.in_(batch)
+        ).delete(synchronize_session=False)
+        db.commit()
+
+    return {"deleted_articles": deleted_articles, "deleted_vectors": deleted_vectors}
+
+def drop_expired_partitions(db: Session, max_days: int) -> int:
+    """Drop weekly chunk partitions that lie entirely before the cutoff (estimated rows)"""
+    cutoff = datetime.now() - timedelta(days=max_days)
+    dropped = drop_chunk_partitions_before(db.connection(), cutoff)
+    if dropped["partitions"]:
+        # Dropped partitions are exactly the weeks before the cutoff's week
+        drop_chunk_days_before(db, week_start(cutoff))
+    db.commit()
+    return dropped["rows"]
+
+def delete_old_vectors_in_batches(db: Session, max_days: int, batch_size: int = 500) -> int:
+    """Delete chunks published before the cutoff, batch_size rows per statement"""
+    cutoff = datetime.now() - timedelta(days=max_days)
+    deleted = 0
+    # Committed with the first batch
+    record_chunks(db, chunk_day_counts(db, ArticleChunk.published_at < cutoff), sign=-1)
+
+    while True:
+        batch = select(ArticleChunk.id).where(
+            ArticleChunk.published_at < cutoff
+        ).limit(batch_size).scalar_subquery()
+        count = db.query(ArticleChunk).filter(
+            ArticleChunk.id.in_(batch)
+        ).delete(synchronize_session=False)
+        db.commit()
+
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+def get_storage_bytes() -> int:
+    """On-disk size of the article and chunk tables (whole file for SQLite)"""
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            # A partitioned parent has no storage of its own; sum its partitions
+            return conn.execute(text("""
+                SELECT pg_total_relation_size('articles')
+                     + pg_total_relation_size('article_chunks')
+                     + COALESCE((
+                         SELECT SUM(pg_total_relation_size(inhrelid))
+                         FROM pg_inherits WHERE inhparent = 'article_chunks'::regclass
+                       ), 0)
+            """)).scalar() or 0
+        if engine.dialect.name == "sqlite":
+            page_count = conn.execute(text("PRAGMA page_count")).scalar() or 0
+            page_size = conn.execute(text("PRAGMA page_size")).scalar() or 0
+            return page_count * page_size
+    return 0
+
+def compact_storage(full: bool = False):
+    """VACUUM the content tables; must run outside a transaction block.
+    Plain VACUUM on Postgres makes dead space reusable and only returns trailing
+    pages to the OS; full=True rewrites the tables (takes an exclusive lock).
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if engine.dialect.name == "postgresql":
+            option = "FULL, ANALYZE" if full else "ANALYZE"
+            conn.execute(text(f"VACUUM ({option}) articles, article_chunks"))
+        elif engine.dialect.name == "sqlite":
+            conn.execute(text("VACUUM"))
+
+def prune_old_content(
+    db: Session,
+    max_articles: Optional[int] = 500,
+    max_days: int = 90,
+    vector_max_days: Optional[int] = None,
+    batch_size: int = 500,
+    compact: bool = True,
+    full_vacuum: bool = False
+) -> dict:
     """
     - Delete articles older than max_days
-    - Keep only latest max_articles by published_at
-    - Remove matching vectors from PGVector by metadata.article_id
+    - Keep only latest max_articles by published_at (None disables the cap)
+    - Remove their chunks from article_chunks
+    - Optionally drop chunks older than vector_max_days while keeping the article
+    - deleted_vectors counts row deletes; dropped_vectors estimates rows in dropped partitions
+    - Compact storage and report the bytes reclaimed
+    - deleted_article_ids lists the removed articles so callers can drop caches that cite them
     """
-    vs = get_vector_store()
-    cutoff = datetime.utcnow() - timedelta(days=max_days)
-
-    # time-based
-    old_ids = db.execute(text("""
-        SELECT id FROM news_articles
-        WHERE published_at IS NOT NULL AND published_at < :cutoff
-    """), {"cutoff": cutoff}).scalars().all()
-
-    # count-based cap (global; change to per-topic if you prefer)
-    over_cap_ids = db.execute(text("""
-        WITH ranked AS (
-          SELECT id, ROW_NUMBER() OVER (ORDER BY published_at DESC NULLS LAST) rn
-          FROM news_articles
-        )
-        SELECT id FROM ranked WHERE rn > :cap
-    """), {"cap": max_articles}).scalars().all()
-
-    ids = list(set(old_ids) | set(over_cap_ids))
-    if not ids:
-        return {"deleted_articles": 0, "deleted_vectors": 0}
-
-    # delete from articles table
-    db.execute(text("DELETE FROM news_articles WHERE id = ANY(:ids)"), {"ids": ids})
-    db.commit()
+    bytes_before = get_storage_bytes()
+
+    # Chunks share their article's published_at, so whole partitions older than
+    # the earliest cutoff are dropped first; row deletes then only touch the
+    # boundary week and chunks of articles removed by the count cap
+    partition_days = min(max_days, vector_max_days) if vector_max_days is not None else max_days
+    dropped_vectors = drop_expired_partitions(db, partition_days)
+
+    ids = get_expired_article_ids(db, max_days=max_days, max_articles=max_articles)
+    report = delete_articles_in_batches(db, ids, batch_size=batch_size)
+
+    if vector_max_days is not None:
+        report["deleted_vectors"] += delete_old_vectors_in_batches(db, vector_max_days, batch_size=batch_size)
+    report["dropped_vectors"] = dropped_vectors
 
-    # delete vectors by metadata filter
-    deleted_vecs = 0
-    for aid in ids:
-        vs.delete(where={"article_id": str(aid)})  # fresh vs each loop is fine
-        deleted_vecs += 1
+    if compact and (report["deleted_articles"] or report["deleted_vectors"] or dropped_vectors):
+        try:
+            compact_storage(full=full_vacuum)
+        except Exception as e:
+            logging.warning(f"Could not compact storage: {e}")
 
-    return {"deleted_articles": len(ids), "deleted_vectors": deleted_vecs}
+    bytes_after = get_storage_bytes()
+    report.update({
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "bytes_reclaimed": max(bytes_before - bytes_after, 0)
+    })
+    logging.info(f"Retention run: {report}")
+    # Added after logging to keep the id list out of the log line
+    report["deleted_article_ids"] = ids
+    return report
@@ -1,13 +1,23 @@
 import os
+import time
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import PGVector
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from app.databases.models import NewsArticle
-from app.databases.database import get_db
+from app.databases.models import NewsArticle, ArticleChunk
+from app.databases.database import get_db, engine, SessionLocal
+from app.databases.vector_store import ChunkVectorStore
+from app.databases.chunk_partitions import ensure_chunk_partitions, chunk_row_estimate, is_partitioned
+from app.databases.article_neighbors import (
+    NEIGHBOR_COUNT, article_vector, nearest_articles, store_article_neighbors
+)
+from app.databases.article_stats import rebuild_article_stats
 from datetime import datetime, timedelta
 from app.scripts.utils.get_embedding_model import get_embedding_model
+from app.scripts.utils.count_tokens import count_tokens, normalize_whitespace
+from app.scripts.retrieval.bm25_index import BM25Index
+from app.services.answer_cache import SemanticAnswerCache
 
 import asyncio
 from dotenv import load_dotenv
@@ -20,9 +30,6 @@ class VectorService:
     def __init__(self):
         self.embeddings = get_embedding_model()  # Load your embedding model
         
-        # Database connection for PGVector
-        self.connection_string = os.getenv("DATABASE_URL")
-        
         # Text splitter configuration
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=2500,
@@ -30,15 +37,24 @@ class VectorService:
             separators=["\n\n", "\n", ". ", "! ", "? ", " ", ""]
         )
         
+        # Legacy LangChain PGVector collection, only read by backfill_from_langchain
         self.collection_name = "news_articles"
-        self.vector_store = PGVector(
-            connection_string=self.connection_string,
+        # Lexical index over chunk text, updated as articles are embedded
+        self.lexical_index = BM25Index()
+        self.vector_store = ChunkVectorStore(
             embedding_function=self.embeddings,
-            collection_name=self.collection_name
+            lexical_index=self.lexical_index
         )
         
-    def _get_vector_store(self) -> PGVector:
-        """Get PGVector instance"""
+        # Previous answers keyed by question embedding, invalidated as articles are embedded
+        self.answer_cache = SemanticAnswerCache()
+        
+        # Chunk rows written / deleted since the ANN index was last maintained
+        self._rows_added = 0
+        self._rows_deleted = 0
+        
+    def _get_vector_store(self) -> ChunkVectorStore:
+        """Get vector store instance"""
         return self.vector_store
     
     async def process_article_for_vectors(self, article: NewsArticle) -> bool:
@@ -59,25 +75,53 @@ class VectorService:
             texts = []
             
             for i, chunk in enumerate(chunks):
+                # Normalize once here so query-time context assembly needs no regex
+                chunk = normalize_whitespace(chunk)
                 metadata = {
                     "article_id": article.id,
                     "title": article.title[:200],  # Truncate long titles
                     "topic": article.topic or "General",
+                    "source": article.source,
                     "url": article.url,
                     "published_at": article.published_at.isoformat(),
                     "chunk_index": i,
+                    "token_count": count_tokens(chunk),
                 }
                 metadatas.append(metadata)
                 texts.append(chunk)
             
-            # Add to vector store
+            # Replace any chunks left from a previous embedding of this article
             vector_store = self._get_vector_store()
+            await asyncio.get_event_loop().run_in_executor(
+                None,
+                vector_store.delete_by_article_ids,
+                [article.id]
+            )
+            
+            # Embed once; the vectors are stored and also used to invalidate cached answers
+            embeddings = await asyncio.get_event_loop().run_in_executor(
+                None,
+                self.embeddings.embed_documents,
+                texts
+            )
+            
+            # Add to vector store
             await asyncio.get_event_loop().run_in_executor(
                 None, 
                 vector_store.add_texts,
                 texts,
-                metadatas
+                metadatas,
+                embeddings
             )
+            self._rows_added += len(texts)
+            await asyncio.get_event_loop().run_in_executor(
+                None,
+                self.refresh_article_neighbors,
+                article.id,
+                embeddings
+            )
+            self.lexical_index.add_article(article.id, article.published_at, texts)
+            self.answer_cache.invalidate_articles([article.id], chunk_embeddings=embeddings)
             
             logging.info(f"Successfully created {len(chunks)} embeddings for article {article.id}")
             return True
@@ -98,6 +142,9 @@ class VectorService:
             # Add small delay to avoid overwhelming the API
             await asyncio.sleep(0.1)
         
+        if successful_ids:
+            await asyncio.get_event_loop().run_in_executor(None, self.maintain_ann_index)
+        
         return successful_ids
     
     async def cleanup_old_vectors(self, days_old: int = 90) -> int:
@@ -106,23 +153,14 @@ class VectorService:
             cutoff_date = datetime.now() - timedelta(days=days_old)
             
             vector_store = self._get_vector_store()
-            
-            # Get all vectors with metadata
-            # Note: This approach depends on your PGVector setup
-            # You might need to adjust based on your specific implementation
-            
-            # Query old vectors using SQL directly if needed
-            from sqlalchemy import create_engine, text
-            engine = create_engine(self.connection_string)
-            
-            delete_query = text("""
-                DELETE FROM langchain_pg_embedding 
-                WHERE cmetadata->>'published_at' < :cutoff_date
-            """)
-            
-            with engine.begin() as conn:
-                result = conn.execute(delete_query, {"cutoff_date": cutoff_date.isoformat()})
-                deleted_count = result.rowcount
+            deleted_count = await asyncio.get_event_loop().run_in_executor(
+                None,
+                vector_store.delete_older_than,
+                cutoff_date
+            )
+            self.lexical_index.remove_older_than(cutoff_date)
+            self._rows_deleted += deleted_count
+            await asyncio.get_event_loop().run_in_executor(None, self.maintain_ann_index)
             
             logging.info(f"Cleaned up {deleted_count} old vector embeddings")
             return deleted_count
@@ -138,22 +176,15 @@ class VectorService:
                 return 0
                 
             vector_store = self._get_vector_store()
-            
-            # Delete vectors for specific article IDs
-            from sqlalchemy import create_engine, text
-            engine = create_engine(self.connection_string)
-            
-            # Convert article IDs to string for JSON query
-            id_list = [str(id) for id in article_ids]
-            
-            delete_query = text("""
-                DELETE FROM langchain_pg_embedding 
-                WHERE cmetadata->>'article_id' = ANY(:article_ids)
-            """)
-            
-            with engine.begin() as conn:
-                result = conn.execute(delete_query, {"article_ids": id_list})
-                deleted_count = result.rowcount
+            deleted_count = await asyncio.get_event_loop().run_in_executor(
+                None,
+                vector_store.delete_by_article_ids,
+                article_ids
+            )
+            self.lexical_index.remove_articles(article_ids)
+            self.answer_cache.invalidate_articles(article_ids)
+            self._rows_deleted += deleted_count
+            await asyncio.get_event_loop().run_in_executor(None, self.maintain_ann_index)
             
             logging.info(f"Deleted {deleted_count} vectors for {len(article_ids)} articles")
             return deleted_count
@@ -199,40 +230,7 @@ class VectorService:
     def get_vector_stats(self) -> Dict:
         """Get statistics about stored vectors"""
         try:
-            from sqlalchemy import create_engine, text
-            engine = create_engine(self.connection_string)
-            
-            stats_query = text("""
-                SELECT 
-                    COUNT(*) as total_vectors,
-                    COUNT(DISTINCT cmetadata->>'article_id') as unique_articles,
-                    MIN(cmetadata->>'published_at') as oldest_article,
-                    MAX(cmetadata->>'published_at') as newest_article
-                FROM langchain_pg_embedding
-                WHERE collection_id = (
-                    SELECT uuid FROM langchain_pg_collection 
-                    WHERE name = :collection_name
-                )
-            """)
-            
-            with engine.connect() as conn:
-                result = conn.execute(stats_query, {"collection_name": self.collection_name})
-                row = result.fetchone()
-                
-                if row:
-                    return {
-                        "total_vectors": row[0] or 0,
-                        "unique_articles": row[1] or 0,
-                        "oldest_article": row[2],
-                        "newest_article": row[3]
-                    }
-            
-            return {
-                "total_vectors": 0,
-                "unique_articles": 0,
-                "oldest_article": None,
-                "newest_article": None
-            }
+            return self._get_vector_store().get_stats()
             
         except Exception as e:
             logging.error(f"Error getting vector stats: {e}")
@@ -242,4 +240,270 @@ class VectorService:
                 "oldest_article": None,
                 "newest_article": None,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+    
+    def build_lexical_index(self) -> int:
+        """Load every stored chunk into the in-memory BM25 index (run once at startup)"""
+        try:
+            start = time.time()
+            for article_id, chunk_index, published_at, content in self.vector_store.iter_chunk_texts():
+                self.lexical_index.add_chunk(article_id, chunk_index, published_at, content)
+            
+            logging.info(f"Lexical index built with {len(self.lexical_index)} chunks in {time.time() - start:.2f}s")
+            return len(self.lexical_index)
+            
+        except Exception as e:
+            logging.error(f"Error building lexical index: {e}")
+            return 0
+    
+    # =========================================================================
+    # ANN INDEX MANAGEMENT
+    # =========================================================================
+    HNSW_INDEX_NAME = "idx_chunk_embedding_hnsw"
+    HNSW_M = 16
+    HNSW_EF_CONSTRUCTION = 64
+    # Rebuild the graph once this share of the table has been deleted since the
+    # last rebuild; HNSW handles inserts incrementally but degrades with deletes
+    REINDEX_DELETE_RATIO = 0.2
+    
+    def _autocommit_connection(self):
+        """Connection for statements that cannot run inside a transaction block"""
+        return engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+    
+    def ensure_ann_index(self) -> bool:
+        """Create the HNSW cosine index on article_chunks.embedding if it is missing"""
+        if engine.dialect.name != "postgresql":
+            return False
+        
+        try:
+            with self._autocommit_connection() as conn:
+                # CONCURRENTLY is not supported on partitioned tables; the parent
+                # index is cascaded to every existing and future partition
+                concurrently = "" if is_partitioned(conn) else "CONCURRENTLY"
+                # IF NOT EXISTS would keep an INVALID index left by an interrupted
+                # build, and search would stay on sequential scans
+                valid = conn.execute(text("""
+                    SELECT i.indisvalid FROM pg_index i
+                    JOIN pg_class c ON c.oid = i.indexrelid
+                    WHERE c.relname = :name
+                """), {"name": self.HNSW_INDEX_NAME}).scalar()
+                if valid is False:
+                    logging.warning(f"Dropping invalid ANN index {self.HNSW_INDEX_NAME} before rebuilding it")
+                    conn.execute(text(f"DROP INDEX {concurrently} IF EXISTS {self.HNSW_INDEX_NAME}"))
+                conn.execute(text("SET maintenance_work_mem = '256MB'"))
+                conn.execute(text(f"""
+                    CREATE INDEX {concurrently} IF NOT EXISTS {self.HNSW_INDEX_NAME}
+                    ON article_chunks USING hnsw (embedding vector_cosine_ops)
+                    WITH (m = {self.HNSW_M}, ef_construction = {self.HNSW_EF_CONSTRUCTION})
+                """))
+                conn.execute(text("ANALYZE article_chunks"))
+            logging.info(f"ANN index {self.HNSW_INDEX_NAME} is ready")
+            return True
+            
+        except Exception as e:
+            logging.error(f"Error creating ANN index: {e}")
+            return False
+    
+    def maintain_ann_index(self, rows_deleted: int = 0) -> str:
+        """Refresh planner stats after bulk loads and rebuild the index after heavy deletes.
+        rows_deleted records chunk deletes made outside this service (retention runs).
+        Returns the action taken: "none", "analyze" or "reindex".
+        """
+        self._rows_deleted += rows_deleted
+        if engine.dialect.name != "postgresql" or not (self._rows_added or self._rows_deleted):
+            return "none"
+        
+        try:
+            with self._autocommit_connection() as conn:
+                row_estimate = chunk_row_estimate(conn)
+                
+                # Without statistics (never analyzed) there is no basis for a rebuild; analyze first
+                if row_estimate and self._rows_deleted and self._rows_deleted >= self.REINDEX_DELETE_RATIO * (row_estimate + self._rows_deleted):
+                    conn.execute(text(f"REINDEX INDEX CONCURRENTLY {self.HNSW_INDEX_NAME}"))
+                    action = "reindex"
+                else:
+                    action = "analyze"
+                conn.execute(text("ANALYZE article_chunks"))
+            
+            logging.info(
+                f"ANN index maintenance: {action} "
+                f"(+{self._rows_added} / -{self._rows_deleted} rows since last run)"
+            )
+            self._rows_added = 0
+            self._rows_deleted = 0
+            return action
+            
+        except Exception as e:
+            logging.error(f"Error maintaining ANN index: {e}")
+            return "none"
+    
+    def benchmark_ann_index(
+        self,
+        num_queries: int = 50,
+        k: int = 10,
+        ef_search_values: Tuple[int, ...] = (40, 80, 160)
+    ) -> Dict:
+        """Compare exact and HNSW search latency and recall@k.
+        Queries are article titles embedded with the production model, so they
+        resemble real questions rather than points already in the index.
+        """
+        db = SessionLocal()
+        try:
+            titles = [row[0] for row in db.query(ArticleChunk.title).filter(
+                ArticleChunk.title.isnot(None)
+            ).distinct().limit(num_queries).all()]
+        finally:
+            db.close()
+        
+        if not titles:
+            return {"error": "No chunks to benchmark"}
+        
+        vector_store = self._get_vector_store()
+        query_embeddings = self.embeddings.embed_documents(titles)
+        
+        def run(**search_kwargs):
+            latencies, results = [], []
+            for embedding in query_embeddings:
+                start = time.perf_counter()
+                hits = vector_store.similarity_search_by_vector_with_score(embedding, k=k, **search_kwargs)
+                latencies.append((time.perf_counter() - start) * 1000)
+                results.append({(doc.metadata["article_id"], doc.metadata["chunk_index"]) for doc, _ in hits})
+            return latencies, results
+        
+        def summarize(latencies):
+            ordered = sorted(latencies)
+            return {
+                "p50_ms": round(ordered[len(ordered) // 2], 2),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+                "mean_ms": round(sum(ordered) / len(ordered), 2),
+            }
+        
+        exact_latencies, exact_results = run(exact=True)
+        report = {
+            "queries": len(titles),
+            "k": k,
+            "exact": summarize(exact_latencies),
+            "ann": []
+        }
+        
+        for ef_search in ef_search_values:
+            ann_latencies, ann_results = run(ef_search=ef_search)
+            recall = sum(
+                len(ann & exact) / max(len(exact), 1)
+                for ann, exact in zip(ann_results, exact_results)
+            ) / len(exact_results)
+            report["ann"].append({
+                "ef_search": ef_search,
+                "recall_at_k": round(recall, 4),
+                **summarize(ann_latencies)
+            })
+        
+        return report
+    
+    def refresh_article_neighbors(self, article_id: int, chunk_embeddings) -> Optional[int]:
+        """Store the article's nearest other articles (one vector search), see article_neighbors.
+        Returns how many were stored, or None if they could not be stored."""
+        # Extra candidates make room for the article's own chunks and repeated articles
+        k = NEIGHBOR_COUNT * 4 + len(chunk_embeddings)
+        db = SessionLocal()
+        try:
+            results = self.vector_store.similarity_search_by_vector_with_score(
+                article_vector(chunk_embeddings), k=k
+            )
+            neighbors = nearest_articles(results, article_id)
+            store_article_neighbors(db, article_id, neighbors)
+            db.commit()
+            return len(neighbors)
+        except Exception as e:
+            db.rollback()
+            logging.error(f"Error storing neighbors for article {article_id}: {e}")
+            return None
+        finally:
+            db.close()
+    
+    def backfill_article_neighbors(self) -> int:
+        """Compute neighbor lists for articles with chunks whose list was never
+        computed (neighbors_computed_at is null), from their stored chunk embeddings.
+        Runs one vector search per article; call it from a background job."""
+        db = SessionLocal()
+        try:
+            missing = db.query(NewsArticle.id).filter(
+                NewsArticle.neighbors_computed_at.is_(None),
+                NewsArticle.id.in_(db.query(ArticleChunk.article_id))
+            ).all()
+            missing = [row[0] for row in missing]
+        finally:
+            db.close()
+        
+        refreshed = 0
+        for article_id in missing:
+            db = SessionLocal()
+            try:
+                chunk_embeddings = [
+                    row[0] for row in db.query(ArticleChunk.embedding).filter(ArticleChunk.article_id == article_id).all()
+                ]
+            finally:
+                db.close()
+            if chunk_embeddings and self.refresh_article_neighbors(article_id, chunk_embeddings) is not None:
+                refreshed += 1
+        
+        if refreshed:
+            logging.info(f"Backfilled neighbor lists for {refreshed} articles")
+        return refreshed
+    
+    def backfill_from_langchain(self) -> int:
+        """Copy embeddings from the legacy langchain_pg_embedding table into article_chunks.
+        Runs once: does nothing if article_chunks already has rows or the legacy table is missing.
+        Typed columns are taken from the articles table, not from the JSON metadata.
+        """
+        if engine.dialect.name != "postgresql":
+            return 0
+        
+        db = SessionLocal()
+        try:
+            if db.query(ArticleChunk.id).first() is not None:
+                return 0
+            
+            legacy_exists = db.execute(
+                text("SELECT to_regclass('langchain_pg_embedding') IS NOT NULL")
+            ).scalar()
+            if not legacy_exists:
+                return 0
+            
+            published_dates = [row[0] for row in db.query(NewsArticle.published_at).all()]
+            ensure_chunk_partitions(db.connection(), published_dates)
+            
+            result = db.execute(text("""
+                INSERT INTO article_chunks
+                    (article_id, chunk_index, topic, source, published_at, title, url, content, embedding)
+                SELECT a.id,
+                       (e.cmetadata->>'chunk_index')::int,
+                       COALESCE(a.topic, 'General'),
+                       a.source,
+                       a.published_at,
+                       LEFT(a.title, 200),
+                       a.url,
+                       BTRIM(REGEXP_REPLACE(e.document, '\\s+', ' ', 'g')),
+                       e.embedding
+                FROM langchain_pg_embedding e
+                JOIN articles a ON a.id = (e.cmetadata->>'article_id')::int
+                WHERE e.collection_id = (
+                    SELECT uuid FROM langchain_pg_collection WHERE name = :collection_name
+                )
+                ON CONFLICT (article_id, chunk_index, published_at) DO NOTHING
+            """), {"collection_name": self.collection_name})
+            db.commit()
+            
+            if result.rowcount:
+                # The raw insert bypasses the chunk counters
+                rebuild_article_stats(db)
+            
+            logging.info(f"Backfilled {result.rowcount} chunks from langchain_pg_embedding")
+            return result.rowcount
+            
+        except Exception as e:
+            db.rollback()
+            logging.error(f"Error backfilling legacy vectors: {e}")
+            return 0
+        finally:
+            db.close()
@@ -213,8 +213,26 @@ class _ChatModalState extends State<ChatModal> with TickerProviderStateMixin {
                   });
                   break;
                 
+                case 'token':
+                  // Grow the partial answer bubble as tokens arrive
+                  currentAnswer += update['content'] ?? '';
+                  if (_messages.isNotEmpty && _messages.last['isPartialAnswer'] == true) {
+                    _messages.last['text'] = currentAnswer;
+                  } else {
+                    _messages.add({
+                      'text': currentAnswer,
+                      'isUser': false,
+                      'isPartialAnswer': true,
+                    });
+                  }
+                  break;
+                
                 case 'complete':
                   final data = update['data'];
+                  if (data == null) break;
+                  if (_messages.isNotEmpty && _messages.last['isPartialAnswer'] == true) {
+                    _messages.removeLast();
+                  }
                   currentAnswer = data['answer'];
                   sources = List<String>.from(data['sources'] ?? []);
                   
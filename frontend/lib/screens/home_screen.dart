@@ -31,7 +31,7 @@ class _HomeScreenState extends State<HomeScreen> {
   
   List<NewsArticle> _articles = [];
   List<String> _topics = ['All'];
-  int _currentPage = 1;
+  String? _nextCursor;
   bool _hasMore = true;
 
   @override
@@ -87,7 +87,7 @@ class _HomeScreenState extends State<HomeScreen> {
     if (isRefresh) {
       setState(() {
         _isRefreshing = true;
-        _currentPage = 1;
+        _nextCursor = null;
         _hasMore = true;
       });
     } else if (isInitial) {
@@ -96,9 +96,12 @@ class _HomeScreenState extends State<HomeScreen> {
 
     try {
       final queryParams = <String, String>{
-        'page': _currentPage.toString(),
         'limit': '20',
       };
+      // Continue after the last article of the previous page
+      if (!isRefresh && !isInitial && _nextCursor != null) {
+        queryParams['cursor'] = _nextCursor!;
+      }
 
       // Add filters
       if (_selectedTopic != 'All') {
@@ -136,7 +139,7 @@ class _HomeScreenState extends State<HomeScreen> {
             _articles.addAll(newArticles);
           }
           _hasMore = data['has_more'] ?? false;
-          _currentPage = data['page'] ?? 1;
+          _nextCursor = data['next_cursor'];
         });
       } else {
         throw Exception('Failed to load news: ${response.statusCode}');
@@ -162,7 +165,6 @@ class _HomeScreenState extends State<HomeScreen> {
   Future<void> _loadMoreNews() async {
     setState(() => _isLoadingMore = true);
     
-    _currentPage++;
     await _loadNews();
     
     setState(() => _isLoadingMore = false);
@@ -174,7 +176,7 @@ class _HomeScreenState extends State<HomeScreen> {
 
   void _applyFilters() {
     setState(() {
-      _currentPage = 1;
+      _nextCursor = null;
       _hasMore = true;
     });
     _loadNews(isRefresh: true);
@@ -252,7 +254,7 @@ class _HomeScreenState extends State<HomeScreen> {
       _searchQuery = '';
       _selectedDateRange = null;
       _searchController.clear();
-      _currentPage = 1;
+      _nextCursor = null;
       _hasMore = true;
     });
     _loadNews(isRefresh: true);
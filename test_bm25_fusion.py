@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.scripts.retrieval.bm25_index import BM25Index, tokenize
+from app.scripts.retrieval.chromadb_retriever import RRF_K, fuse_results
+
+# Behaviour tests for the BM25 index and reciprocal rank fusion
+# Run with: python -m pytest -q test_bm25_fusion.py
+
+NOW = datetime(2025, 1, 15)
+
+def build_index():
+    index = BM25Index()
+    index.add_article(1, NOW, [
+        "Nvidia shares rallied after record data center revenue",
+        "Analysts raised their NVDA price targets",
+    ])
+    index.add_article(2, NOW - timedelta(days=40), [
+        "The central bank held interest rates steady",
+    ])
+    index.add_article(3, NOW, [
+        "Inflation cooled in December as energy prices fell",
+    ])
+    return index
+
+def result(article_id, chunk_index, distance):
+    doc = SimpleNamespace(metadata={"article_id": article_id, "chunk_index": chunk_index})
+    return (doc, distance, [1.0, 0.0])
+
+def keys(results):
+    return [(doc.metadata["article_id"], doc.metadata["chunk_index"]) for doc, _, _ in results]
+
+def test_tokenize_drops_stopwords_and_keeps_tickers():
+    assert tokenize("What is the latest on AT&T and the U.S. economy?") == ["at&t", "u.s", "economy"]
+
+def test_search_ranks_matching_chunks():
+    index = build_index()
+    hits = index.search("nvidia revenue", k=5)
+    assert hits[0][0] == (1, 0)
+    assert hits[0][2] == 1.0
+    assert all(score > 0 for _, score, _ in hits)
+
+def test_search_reports_share_of_terms_matched():
+    index = build_index()
+    hits = dict((key, coverage) for key, _, coverage in index.search("inflation rates", k=5))
+    assert hits == {(3, 0): 0.5, (2, 0): 0.5}
+
+def test_search_without_terms_or_documents():
+    assert build_index().search("what is the", k=5) == []
+    assert BM25Index().search("inflation", k=5) == []
+
+def test_add_article_replaces_previous_version():
+    index = build_index()
+    index.add_article(3, NOW, ["Unemployment rose slightly"])
+    assert index.search("inflation", k=5) == []
+    assert index.search("unemployment", k=5)[0][0] == (3, 0)
+    assert len(index) == 4
+
+def test_add_chunk_skips_indexed_chunks():
+    index = build_index()
+    index.add_chunk(1, 0, NOW, "completely different text")
+    assert index.search("completely", k=5) == []
+    assert len(index) == 4
+
+def test_remove_articles_and_older_than():
+    index = build_index()
+    index.remove_articles([1])
+    assert index.search("nvidia", k=5) == []
+    assert index.remove_older_than(NOW - timedelta(days=7)) == 1
+    assert index.search("interest rates", k=5) == []
+    assert len(index) == 1
+    assert index.total_length == sum(index.doc_lengths.values())
+
+def test_fusion_orders_by_reciprocal_rank():
+    vector_results = [result(1, 0, 0.20), result(2, 0, 0.25), result(3, 0, 0.30)]
+    lexical_hits = [((3, 0), 9.0, 1.0), ((2, 0), 4.0, 0.5)]
+    fused = fuse_results(vector_results, lexical_hits, [], k=3)
+    # (3, 0) and (2, 0) appear in both rankings and overtake the dense-only top hit
+    scores = {
+        (1, 0): 1.0 / (RRF_K + 1),
+        (2, 0): 1.0 / (RRF_K + 2) + 1.0 / (RRF_K + 2),
+        (3, 0): 1.0 / (RRF_K + 3) + 1.0 / (RRF_K + 1),
+    }
+    assert keys(fused) == sorted(scores, key=scores.get, reverse=True) == [(3, 0), (2, 0), (1, 0)]
+
+def test_fusion_keeps_real_dense_distances():
+    vector_results = [result(1, 0, 0.20)]
+    lexical_results = [result(4, 1, 0.62)]
+    lexical_hits = [((4, 1), 12.0, 1.0), ((1, 0), 3.0, 0.5)]
+    fused = fuse_results(vector_results, lexical_hits, lexical_results, k=5)
+    assert {key: distance for key, (_, distance, _) in zip(keys(fused), fused)} == {(1, 0): 0.20, (4, 1): 0.62}
+
+def test_fusion_skips_stale_lexical_hits_and_truncates():
+    vector_results = [result(1, 0, 0.20), result(1, 1, 0.30)]
+    lexical_hits = [((9, 0), 12.0, 1.0), ((1, 1), 3.0, 1.0)]
+    fused = fuse_results(vector_results, lexical_hits, [], k=1)
+    assert keys(fused) == [(1, 1)]
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.databases.crud import NewsService
+from app.databases.models import Base, NewsArticle
+
+# Behaviour tests for keyset pagination of the news feed
+# Run with: python -m pytest -q test_cursor.py
+
+NOON = datetime(2025, 3, 1, 12, 0, 0)
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    # Groups of articles sharing a published_at, so pages have to split ties by id
+    for i in range(25):
+        session.add(NewsArticle(
+            title=f"Article {i}",
+            url=f"https://example.com/{i}",
+            source="bbc" if i % 2 else "reuters",
+            body="body",
+            published_at=NOON - timedelta(hours=i // 4),
+            topic="World" if i % 3 else "Business",
+            ai_summary=f"Summary {i}",
+            is_processed=True,
+        ))
+    # Never in the feed
+    session.add(NewsArticle(title="Pending", url="https://example.com/pending", source="bbc",
+                            body="body", published_at=NOON, is_processed=False))
+    session.commit()
+    yield session
+    session.close()
+
+def read_all_pages(db, limit, **filters):
+    pages = []
+    cursor = None
+    while True:
+        articles, cursor = NewsService.get_articles_page(db, limit=limit, cursor=cursor, **filters)
+        pages.append(articles)
+        if cursor is None:
+            return pages
+
+def test_cursor_round_trip():
+    article = SimpleNamespace(id=42, published_at=NOON)
+    cursor = NewsService.encode_cursor(article)
+    assert "=" not in cursor
+    assert NewsService.decode_cursor(cursor) == (NOON, 42)
+
+def test_cursor_round_trip_keeps_microseconds():
+    published_at = NOON.replace(microsecond=123456)
+    cursor = NewsService.encode_cursor(SimpleNamespace(id=7, published_at=published_at))
+    assert NewsService.decode_cursor(cursor) == (published_at, 7)
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", "W10", "WyJub3QgYSBkYXRlIiwgMV0"])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        NewsService.decode_cursor(cursor)
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 7, 25, 30])
+def test_pages_cover_the_feed_once_in_order(db, limit):
+    pages = read_all_pages(db, limit)
+    rows = [article for page in pages for article in page]
+    keys = [(article.published_at, article.id) for article in rows]
+
+    assert len(rows) == 25
+    assert len(set(keys)) == 25
+    assert keys == sorted(keys, reverse=True)
+    assert all(len(page) == limit for page in pages[:-1])
+
+def test_page_boundary_inside_a_tie(db):
+    # The first four articles share published_at; a page of 2 ends inside the tie
+    first, cursor = NewsService.get_articles_page(db, limit=2)
+    second, _ = NewsService.get_articles_page(db, limit=2, cursor=cursor)
+    assert {article.published_at for article in first + second} == {NOON}
+    assert [article.id for article in first + second] == [4, 3, 2, 1]
+
+def test_last_page_has_no_cursor(db):
+    articles, cursor = NewsService.get_articles_page(db, limit=25)
+    assert len(articles) == 25 and cursor is None
+
+def test_filters_apply_on_every_page(db):
+    pages = read_all_pages(db, 2, topic="Business", source="reuters")
+    rows = [article for page in pages for article in page]
+    expected = [i for i in range(25) if i % 3 == 0 and i % 2 == 0]
+    assert sorted(int(article.title.split()[1]) for article in rows) == expected
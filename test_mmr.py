@@ -0,0 +1,46 @@
+import numpy as np
+
+from app.scripts.retrieval.mmr import mmr_select
+
+# Behaviour tests for maximal marginal relevance selection
+# Run with: python -m pytest -q test_mmr.py
+
+QUERY = [1.0, 0.0, 0.0]
+# Two near-duplicates of the most relevant chunk and one on a different aspect
+CANDIDATES = [
+    [0.95, 0.31, 0.0],
+    [0.94, 0.34, 0.0],
+    [0.80, 0.0, 0.60],
+    [0.0, 1.0, 0.0],
+]
+
+def test_pure_relevance_keeps_similarity_order():
+    assert mmr_select(QUERY, CANDIDATES, 4, lambda_mult=1.0) == [0, 1, 2, 3]
+
+def test_diversity_skips_near_duplicates():
+    picks = mmr_select(QUERY, CANDIDATES, 2, lambda_mult=0.5)
+    assert picks == [0, 2]
+
+def test_first_pick_is_most_relevant():
+    for lambda_mult in (0.0, 0.3, 0.7, 1.0):
+        assert mmr_select(QUERY, CANDIDATES, 1, lambda_mult=lambda_mult) == [0]
+
+def test_explicit_relevance_overrides_query_similarity():
+    picks = mmr_select(None, CANDIDATES, 2, lambda_mult=1.0, relevance=[0.1, 0.2, 0.9, 0.3])
+    assert picks == [2, 3]
+
+def test_returns_unique_indices_and_caps_k():
+    picks = mmr_select(QUERY, CANDIDATES, 10, lambda_mult=0.5)
+    assert sorted(picks) == [0, 1, 2, 3]
+
+def test_empty_candidates():
+    assert mmr_select(QUERY, [], 3) == []
+    assert mmr_select(QUERY, np.zeros((0, 3)), 3) == []
+
+def test_inputs_are_not_modified():
+    query = np.array(QUERY, dtype=np.float32) * 5
+    candidates = np.array(CANDIDATES, dtype=np.float32) * 3
+    before = candidates.copy()
+    mmr_select(query, candidates, 2)
+    assert np.array_equal(candidates, before)
+    assert np.array_equal(query, np.array(QUERY, dtype=np.float32) * 5)
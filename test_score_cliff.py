@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+from app.scripts.retrieval.chromadb_retriever import adaptive_vector_search, find_score_cliff
+
+# Behaviour tests for adaptive k (relevance cliff detection)
+# Run with: python -m pytest -q test_score_cliff.py
+
+def test_cut_at_gap_between_neighbours():
+    # 0.26 -> 0.41 is a jump of 0.15 >= SCORE_GAP
+    assert find_score_cliff([0.20, 0.22, 0.24, 0.26, 0.41, 0.43]) == 4
+
+def test_cut_when_spread_from_best_is_too_wide():
+    # No single gap reaches 0.08, but 0.43 is more than 0.2 worse than 0.20
+    assert find_score_cliff([0.20, 0.26, 0.32, 0.38, 0.43, 0.45]) == 4
+
+def test_first_min_k_are_always_kept():
+    assert find_score_cliff([0.10, 0.50, 0.55, 0.90], min_k=3) == 3
+    assert find_score_cliff([0.10, 0.50, 0.55, 0.90], min_k=1) == 1
+
+def test_no_cliff():
+    assert find_score_cliff([0.30, 0.31, 0.33, 0.36, 0.40]) is None
+    assert find_score_cliff([0.2, 0.9], min_k=3) is None
+    assert find_score_cliff([]) is None
+
+def test_custom_thresholds():
+    # Steps of 0.0625 are exact in binary floating point
+    scores = [0.25, 0.3125, 0.375, 0.4375]
+    assert find_score_cliff(scores, min_k=1, gap=0.0625) == 1
+    assert find_score_cliff(scores, min_k=1, spread=0.1) == 2
+    assert find_score_cliff(scores, min_k=1) is None
+
+class FakeStore:
+    """Vector store returning fixed distances, recording each requested k"""
+    def __init__(self, distances):
+        self.distances = distances
+        self.requests = []
+
+    def similarity_search_by_vector_with_score(self, embedding, k, filter=None, with_embeddings=False):
+        self.requests.append(k)
+        return [
+            (SimpleNamespace(metadata={"article_id": i, "chunk_index": 0}), distance, [1.0, 0.0])
+            for i, distance in enumerate(self.distances[:k])
+        ]
+
+def test_adaptive_search_fetches_once_and_cuts_at_the_cliff():
+    store = FakeStore([0.10, 0.12, 0.15, 0.17, 0.35] + [0.36] * 15)
+    results = adaptive_vector_search(store, [1.0, 0.0], max_k=20, windows=(None,))
+    assert [distance for _, distance, _ in results] == [0.10, 0.12, 0.15, 0.17]
+    assert store.requests == [20]
+
+def test_adaptive_search_keeps_everything_without_a_cliff():
+    store = FakeStore([0.10, 0.12, 0.14, 0.16])
+    results = adaptive_vector_search(store, [1.0, 0.0], max_k=20, windows=(None,))
+    assert len(results) == 4
+    assert store.requests == [20]
@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+from app.infra.singleflight import SingleFlight
+
+# Behaviour tests for request coalescing
+# Run with: python -m pytest -q test_singleflight.py
+
+def test_do_coalesces_concurrent_callers():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(*(flight.do("q", work) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert results == ["answer"] * 5
+    assert len(calls) == 1
+    assert flight.get_stats() == {"in_flight": 0, "executions": 1, "coalesced": 4}
+
+def test_do_runs_again_after_the_key_is_released():
+    async def main():
+        flight = SingleFlight("test")
+        first = await flight.do("q", lambda: asyncio.sleep(0, "first"))
+        second = await flight.do("q", lambda: asyncio.sleep(0, "second"))
+        other = await asyncio.gather(
+            flight.do("a", lambda: asyncio.sleep(0.01, "a")),
+            flight.do("b", lambda: asyncio.sleep(0.01, "b"))
+        )
+        return flight, first, second, other
+
+    flight, first, second, other = asyncio.run(main())
+    assert (first, second, other) == ("first", "second", ["a", "b"])
+    assert flight.executions == 4 and flight.coalesced == 0
+
+def test_do_shares_errors():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    async def main():
+        flight = SingleFlight("test")
+        return await asyncio.gather(flight.do("q", fail), flight.do("q", fail), return_exceptions=True)
+
+    errors = asyncio.run(main())
+    assert [str(error) for error in errors] == ["upstream failed"] * 2
+
+def test_cancelled_caller_does_not_cancel_the_shared_work():
+    async def main():
+        flight = SingleFlight("test")
+        finished = asyncio.Event()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            finished.set()
+            return "answer"
+
+        first = asyncio.create_task(flight.do("q", work))
+        second = asyncio.create_task(flight.do("q", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, finished.is_set()
+
+    assert asyncio.run(main()) == ("answer", True)
+
+def test_stream_replays_every_event_to_late_subscribers():
+    async def events():
+        for i in range(3):
+            yield i
+            await asyncio.sleep(0.01)
+
+    async def collect(flight, delay):
+        await asyncio.sleep(delay)
+        return [event async for event in flight.stream("q", events)]
+
+    async def main():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(collect(flight, 0), collect(flight, 0.015))
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert results == [[0, 1, 2], [0, 1, 2]]
+    assert flight.executions == 1 and flight.coalesced == 1
+    assert flight.get_stats()["in_flight"] == 0
+
+def test_stream_error_reaches_every_subscriber_after_its_events():
+    async def events():
+        yield "partial"
+        await asyncio.sleep(0.01)
+        raise RuntimeError("stream broke")
+
+    async def collect(flight, received):
+        async for event in flight.stream("q", events):
+            received.append(event)
+
+    async def main():
+        flight = SingleFlight("test")
+        received = ([], [])
+        errors = await asyncio.gather(
+            collect(flight, received[0]), collect(flight, received[1]), return_exceptions=True
+        )
+        return received, errors
+
+    received, errors = asyncio.run(main())
+    assert received == (["partial"], ["partial"])
+    assert [str(error) for error in errors] == ["stream broke"] * 2
+
+def test_disconnected_subscriber_does_not_stop_the_stream():
+    async def main():
+        flight = SingleFlight("test")
+
+        async def events():
+            for i in range(4):
+                await asyncio.sleep(0.01)
+                yield i
+
+        async def first_event_only():
+            async for event in flight.stream("q", events):
+                return event
+
+        async def everything():
+            return [event async for event in flight.stream("q", events)]
+
+        leaver = asyncio.create_task(first_event_only())
+        stayer = asyncio.create_task(everything())
+        return await leaver, await stayer
+
+    assert asyncio.run(main()) == (0, [0, 1, 2, 3])